@@ -0,0 +1,58 @@
+"""Time Compositor blending and crossfades on a desktop Python.
+
+    python bench/compose.py [num_leds] [frames]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns.bake import BakeCache
+from patterns.compositor import Compositor, BLEND_ADD, BLEND_ALPHA, BLEND_MAX
+from patterns.error import Error
+from patterns.pattern import GRB
+from patterns.progress import Progress
+
+
+def run(name, setup, num_leds, frames):
+    comp = Compositor(num_leds, len(GRB), BakeCache(), fade_ms=10 ** 6)
+    setup(comp)
+    buf = bytearray(num_leds * len(GRB))
+    comp.update(0.0, 0.5)
+    comp.render_into(buf, num_leds, GRB)  # Bake and warm up
+    t0 = time.perf_counter()
+    for f in range(frames):
+        comp.update(f * 0.01, 0.5)
+        comp.render_into(buf, num_leds, GRB)
+    us = (time.perf_counter() - t0) * 1e6 / frames
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for f in range(frames):
+        comp.update(f * 0.01, 0.5)
+        comp.render_into(buf, num_leds, GRB)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{name:<22} {us:>9.1f} {retained:>9}")
+
+
+def main():
+    num_leds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{num_leds} LEDs, {frames} frames")
+    print(f"{'case':<22} {'us/frame':>9} {'retained':>9}")
+    run('base only', lambda c: c.transition(Progress(), fade=False), num_leds, frames)
+    for name, mode in (('alpha', BLEND_ALPHA), ('add', BLEND_ADD), ('max', BLEND_MAX)):
+        run(f'overlay {name}', lambda c, m=mode: c.transition(Progress(), ((Error(), m, 192),), fade=False),
+            num_leds, frames)
+
+    def crossfade(c):
+        c.transition(Error(), fade=False)
+        c.transition(Progress(), ((Error(), BLEND_MAX, 256),))
+    run('crossfade + overlay', crossfade, num_leds, frames)
+
+
+if __name__ == '__main__':
+    main()
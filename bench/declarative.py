@@ -0,0 +1,67 @@
+"""Compare settings.json patterns with the hand-written classes they mimic.
+
+Each pair should render the same frames; the script checks that and
+prints microseconds per frame for both on a desktop Python.
+
+    python bench/declarative.py [num_leds] [frames]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns.declarative import compile_pattern  # noqa: E402
+from patterns.error import Error  # noqa: E402
+from patterns.pattern import GRB  # noqa: E402
+from patterns.progress import Progress  # noqa: E402
+
+PAIRS = (
+    ('breathe', Error, {"type": "breathe", "color": [255, 0, 0], "period": 2.0, "gamma": 2.2}),
+    ('bar', Progress, {"type": "bar", "color": [0, 255, 0], "background": [255, 255, 255]}),
+    ('chase', None, {"type": "chase", "color": [0, 0, 255], "length": 8, "period": 3.0}),
+    ('solid', None, {"type": "solid", "color": [16, 16, 16]}),
+)
+
+
+def time_frames(pattern, num_leds, frames):
+    buf = bytearray(num_leds * len(GRB))
+    pattern.num_leds = num_leds
+    t0 = time.perf_counter()
+    for f in range(frames):
+        pattern.update(f * 0.01, (f % 100) / 100.0)
+        pattern.render_into(buf, num_leds, GRB)
+    return (time.perf_counter() - t0) * 1e6 / frames
+
+
+def max_diff(a, b, num_leds, frames=200):
+    buf_a = bytearray(num_leds * len(GRB))
+    buf_b = bytearray(num_leds * len(GRB))
+    a.num_leds = b.num_leds = num_leds
+    worst = 0
+    for f in range(frames):
+        for p, buf in ((a, buf_a), (b, buf_b)):
+            p.update(f * 0.01, (f % 100) / 100.0)
+            p.render_into(buf, num_leds, GRB)
+        worst = max(worst, max(abs(x - y) for x, y in zip(buf_a, buf_b)))
+    return worst
+
+
+def main():
+    num_leds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    print(f"{num_leds} LEDs, {frames} frames")
+    print(f"{'type':<10} {'declared us':>12} {'class us':>9} {'max diff':>9}")
+    for name, cls, spec in PAIRS:
+        factory = compile_pattern(name, spec)
+        declared = time_frames(factory(), num_leds, frames)
+        if cls is None:
+            print(f"{name:<10} {declared:>12.1f} {'-':>9} {'-':>9}")
+            continue
+        hand = time_frames(cls(), num_leds, frames)
+        print(f"{name:<10} {declared:>12.1f} {hand:>9.1f} {max_diff(factory(), cls(), num_leds):>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Time runtime/log.py against print() on a desktop Python.
+
+Logs the per-message line sub_cb used to print, once with print() to a
+pipe (standing in for USB-CDC, which is far slower on the board), once
+into the ring and once at a disabled level, then reads the ring back.
+
+    python bench/log.py [messages]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'host'))
+sys.path.insert(0, ROOT)
+
+import compat  # noqa: E402
+
+compat.install()
+
+from runtime import log  # noqa: E402
+
+
+def per_call(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    out = os.fdopen(w, 'w', buffering=1)
+
+    def drain():
+        try:
+            while os.read(r, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def with_print(i):
+        print(f"Got message for 01S00A000000000 with size of: {i}, parsing.", file=out)
+        if not i & 63:
+            drain()
+
+    log.configure(log.INFO, echo=log.ERROR + 1, size=4096)
+    print(f"{n} messages")
+    print(f"{'case':<22} {'us/msg':>9}")
+    print(f"{'print':<22} {per_call(with_print, n):>9.2f}")
+    print(f"{'ring (info)':<22} {per_call(lambda i: log.info('Got message for %s with size of %d', '01S00A000000000', i), n):>9.2f}")
+    print(f"{'disabled (debug)':<22} {per_call(lambda i: log.debug('Got message for %s with size of %d', '01S00A000000000', i), n):>9.2f}")
+    t0 = time.perf_counter()
+    lines = len(log.text().splitlines())
+    print(f"{'read ring':<22} {(time.perf_counter() - t0) * 1e3:>9.2f} ms for {lines} records "
+          f"({log.ring().overwritten} overwritten)")
+
+
+if __name__ == '__main__':
+    main()
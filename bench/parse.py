@@ -0,0 +1,67 @@
+"""Compare ReportExtractor with json.loads on captured Bambu reports.
+
+Reports in bench/reports/*.json are parsed both ways; the script checks
+the extracted fields agree and prints time and peak traced memory per
+parse. Run on a desktop Python: python bench/parse.py [iterations]
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from printer.report import ReportExtractor, REPORT_FIELDS
+
+
+def via_json(payload):
+    # What sub_cb did before: decode, build the whole dict, then index it.
+    data = json.loads(payload.decode('utf-8'))
+    out = {}
+    for name, path in REPORT_FIELDS.items():
+        node = data
+        try:
+            for part in path:
+                node = node[part]
+        except (KeyError, IndexError):
+            continue
+        out[name] = node
+    return out
+
+
+def measure(fn, payload, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn(payload)
+    us = (time.perf_counter() - t0) * 1e6 / iterations
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return us, peak
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    extractor = ReportExtractor()
+    reports = os.path.join(ROOT, 'bench', 'reports')
+    print(f"{'report':<10} {'bytes':>6} {'json us':>9} {'json peak':>10} {'scan us':>9} {'scan peak':>10} {'view us':>9} {'view peak':>10}")
+    for name in sorted(os.listdir(reports)):
+        with open(os.path.join(reports, name), 'rb') as f:
+            payload = f.read()
+        if via_json(payload) != extractor.extract(payload):
+            print(f"{name}: extracted fields differ from json.loads")
+        if via_json(payload) != extractor.extract(memoryview(payload)):
+            print(f"{name}: memoryview extraction differs from json.loads")
+        json_us, json_peak = measure(via_json, payload, iterations)
+        scan_us, scan_peak = measure(extractor.extract, payload, iterations)
+        # Zero-copy mqtt_as delivery hands sub_cb a memoryview instead of bytes.
+        view_us, view_peak = measure(extractor.extract, memoryview(payload), iterations)
+        print(f"{name[:-5]:<10} {len(payload):>6} {json_us:>9.1f} {json_peak:>10} {scan_us:>9.1f} {scan_peak:>10} {view_us:>9.1f} {view_peak:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Time the ColorPipeline correction pass on a desktop Python.
+
+    python bench/pipeline.py [num_leds] [frames]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output.pipeline import ColorPipeline
+from patterns.progress import Progress
+
+
+def main():
+    num_leds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{num_leds} LEDs, {frames} frames")
+    print(f"{'setup':<28} {'us/frame':>9}")
+    cases = (
+        ('GRB, neutral (skipped)', ColorPipeline('GRB')),
+        ('GRB, brightness 0.5', ColorPipeline('GRB', 0.5)),
+        ('GRB, 0.5 + gamma 2.2 + wb', ColorPipeline('GRB', 0.5, 2.2, (1.0, 0.9, 0.8))),
+        ('GRBW, brightness 0.5', ColorPipeline('GRBW', 0.5)),
+    )
+    for name, pipeline in cases:
+        pattern = Progress()
+        pattern.num_leds = num_leds
+        pattern.update(0.0, 0.5)
+        buf = bytearray(num_leds * pipeline.bpp)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            pattern.render_into(buf, num_leds, pipeline.order)
+            pipeline.apply(buf, num_leds)
+        print(f"{name:<28} {(time.perf_counter() - t0) * 1e6 / frames:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Time pattern imports and state transitions on a desktop Python.
+
+Compares building new pattern objects on every transition (as main.py
+used to) with reusing PatternRegistry instances, and times a cold import
+of each pattern module.
+
+    python bench/registry.py [num_leds] [transitions]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'host'))
+sys.path.insert(0, ROOT)
+
+import compat  # noqa: E402
+
+compat.install()
+
+from patterns.compositor import Compositor, BLEND_MAX  # noqa: E402
+from patterns.pattern import GRB  # noqa: E402
+from patterns.registry import PatternRegistry, PATTERNS  # noqa: E402
+
+# A cycle of (base, overlay) states like a print going through its stages.
+STATES = (('prepare', None), ('progress', None), ('progress', 'error'), ('paused', None),
+          ('progress', None), ('finish', None), ('idle', None))
+
+
+def run(name, get, num_leds, transitions):
+    comp = Compositor(num_leds, len(GRB), None, fade_ms=0)
+    buf = bytearray(num_leds * len(GRB))
+
+    def step(i):
+        base, overlay = STATES[i % len(STATES)]
+        overlays = ((get(overlay), BLEND_MAX, 256),) if overlay else ()
+        comp.transition(get(base), overlays)
+        comp.update(i * 0.01, 0.5)
+        comp.render_into(buf, num_leds, GRB)
+
+    for i in range(len(STATES)):
+        step(i)  # Import everything first
+    t0 = time.perf_counter()
+    for i in range(transitions):
+        step(i)
+    us = (time.perf_counter() - t0) * 1e6 / transitions
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[1]
+    for i in range(transitions):
+        step(i)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    print(f"{name:<22} {us:>9.1f} {peak:>9}")
+
+
+def main():
+    num_leds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    transitions = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    print(f"{num_leds} LEDs, {transitions} transitions")
+    print(f"{'case':<22} {'us/trans':>9} {'peak B':>9}")
+    fresh = PatternRegistry()
+    run('new instances', lambda name: fresh.factory(name)(), num_leds, transitions)
+    reuse = PatternRegistry()
+    run('registry reuse', lambda name: reuse.get(name), num_leds, transitions)
+
+    print()
+    print(f"{'cold import':<22} {'us':>9}")
+    registry = PatternRegistry()
+    for name, (module, _) in PATTERNS.items():
+        sys.modules.pop(module, None)  # Shared bases such as patterns.breathe stay loaded
+        registry.get(name)
+        print(f"{name:<22} {registry.import_us[name]:>9}")
+
+
+if __name__ == '__main__':
+    main()
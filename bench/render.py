@@ -0,0 +1,88 @@
+"""Compare the per-LED at() render path with Pattern.render_into() and
+BakeCache playback.
+
+Runs on a desktop Python: python bench/render.py [num_leds] [frames]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns.bake import BakeCache
+from patterns.breathe import Breathe
+from patterns.idle import Idle
+from patterns.paused import Paused
+from patterns.progress import Progress
+
+
+class FakeNeoPixel:
+    """Mirrors the buffer layout and __setitem__ of MicroPython's NeoPixel."""
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, n, bpp=3):
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for c in range(self.bpp):
+            self.buf[offset + self.ORDER[c]] = v[c]
+
+
+def old_path(pattern, np, num_leds):
+    # The loop update_pattern() used before render_into().
+    if pattern.all_same:
+        color = pattern.at(0)
+        for i in range(num_leds):
+            np[i] = color
+    else:
+        for i in range(num_leds):
+            np[i] = pattern.at(i)
+
+
+def new_path(pattern, np, num_leds):
+    pattern.render_into(np.buf, num_leds, np.ORDER[:np.bpp])
+
+
+def baked_path(cache):
+    def path(pattern, np, num_leds):
+        cache.render_into(pattern, np.buf, num_leds, np.ORDER[:np.bpp])
+    return path
+
+
+def run(path, pattern, np, num_leds, frames):
+    t0 = time.perf_counter()
+    for f in range(frames):
+        pattern.update(f * 0.01, (f % 100) / 100.0)
+        path(pattern, np, num_leds)
+    return (time.perf_counter() - t0) * 1e6 / frames
+
+
+def main():
+    num_leds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    print(f"{num_leds} LEDs, {frames} frames")
+    print(f"{'pattern':<10} {'at()':>10} {'render_into':>12} {'baked':>10} {'speedup':>8}  (us/frame)")
+    for cls in (Idle, Breathe, Progress, Paused):
+        old_np = FakeNeoPixel(num_leds)
+        new_np = FakeNeoPixel(num_leds)
+        pattern = cls()
+        pattern.num_leds = num_leds
+        old_us = run(old_path, pattern, old_np, num_leds, frames)
+        pattern = cls()
+        pattern.num_leds = num_leds
+        new_us = run(new_path, pattern, new_np, num_leds, frames)
+        if old_np.buf != new_np.buf:
+            print(f"{cls.__name__}: output mismatch between paths")
+        pattern = cls()
+        pattern.num_leds = num_leds
+        baked_us = run(baked_path(BakeCache(fps=100)), pattern, FakeNeoPixel(num_leds), num_leds, frames)
+        best = min(new_us, baked_us)
+        print(f"{cls.__name__:<10} {old_us:>10.1f} {new_us:>12.1f} {baked_us:>10.1f} {old_us / best:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Headless benchmark of every pattern under patterns/.
+
+Each Pattern subclass that can be built without arguments is rendered for
+N frames at several strip sizes, both live (render_into) and through a
+BakeCache. For every run the suite reports microseconds per frame, Python
+function calls per frame and peak bytes allocated per frame (tracemalloc).
+Needs only a desktop Python; no machine, neopixel or pygame.
+
+    python bench/suite.py                       # table on stdout
+    python bench/suite.py --json run.json       # also save results
+    python bench/suite.py --compare old.json    # show change vs a saved run
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'host'))
+sys.path.insert(0, ROOT)
+
+import compat  # noqa: E402
+
+# Some modules under patterns/ use MicroPython's time.ticks_* at import.
+compat.install()
+
+from patterns.bake import BakeCache  # noqa: E402
+from patterns.pattern import GRB, Pattern  # noqa: E402
+
+SIZES = (64, 300, 1000)
+
+
+def discover():
+    """Return (name, class) for every concrete pattern in patterns/."""
+    found = []
+    for filename in sorted(os.listdir(os.path.join(ROOT, 'patterns'))):
+        if not filename.endswith('.py'):
+            continue
+        module = importlib.import_module('patterns.' + filename[:-3])
+        for name in sorted(dir(module)):
+            cls = getattr(module, name)
+            if (isinstance(cls, type) and issubclass(cls, Pattern) and cls is not Pattern
+                    and cls.__module__ == module.__name__):
+                try:
+                    cls()
+                except TypeError:
+                    continue  # Needs constructor arguments
+                found.append((name, cls))
+    return found
+
+
+def make_frame(path, pattern, num_leds):
+    buf = bytearray(num_leds * len(GRB))
+    if path == 'baked':
+        cache = BakeCache(budget=1 << 20)
+        return lambda: cache.render_into(pattern, buf, num_leds, GRB)
+    return lambda: pattern.render_into(buf, num_leds, GRB)
+
+
+def bench(cls, num_leds, path, frames):
+    pattern = cls()
+    pattern.num_leds = num_leds
+    frame = make_frame(path, pattern, num_leds)
+    # Warm up: the first baked frame pays for the bake.
+    pattern.update(0.0, 0.5)
+    frame()
+
+    t0 = time.perf_counter()
+    for f in range(frames):
+        pattern.update(f * 0.01, (f % 100) / 100.0)
+        frame()
+    us = (time.perf_counter() - t0) * 1e6 / frames
+
+    calls = [0]
+
+    def count(frame_, event, arg):
+        if event == 'call' or event == 'c_call':
+            calls[0] += 1
+    sys.setprofile(count)
+    for f in range(frames):
+        pattern.update(f * 0.01, (f % 100) / 100.0)
+        frame()
+    sys.setprofile(None)
+
+    tracemalloc.start()
+    peak = 0
+    for f in range(frames):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        pattern.update(f * 0.01, (f % 100) / 100.0)
+        frame()
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {
+        'pattern': cls.__name__,
+        'leds': num_leds,
+        'path': path,
+        'us_per_frame': round(us, 2),
+        'calls_per_frame': round(calls[0] / frames, 1),
+        'bytes_per_frame': round(peak / frames, 1),
+    }
+
+
+def key(result):
+    return (result['pattern'], result['leds'], result['path'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--frames', type=int, default=200)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {key(r): r for r in json.load(f)['results']}
+
+    results = []
+    print(f"{'pattern':<10} {'leds':>5} {'path':<6} {'us/frame':>9} {'calls':>7} {'bytes':>8}")
+    for name, cls in discover():
+        for num_leds in args.sizes:
+            for path in ('live', 'baked'):
+                r = bench(cls, num_leds, path, args.frames)
+                results.append(r)
+                line = (f"{r['pattern']:<10} {r['leds']:>5} {r['path']:<6} {r['us_per_frame']:>9.1f}"
+                        f" {r['calls_per_frame']:>7.1f} {r['bytes_per_frame']:>8.1f}")
+                old = baseline.get(key(r))
+                if old:
+                    line += f"  {r['us_per_frame'] / old['us_per_frame']:>5.2f}x time"
+                print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'frames': args.frames,
+                'results': results,
+            }, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Minimal in-process MQTT 3.1.1 broker for host-side test rigs.
+
+Supports what the firmware uses: CONNECT, SUBSCRIBE/UNSUBSCRIBE with
+`+`/`#` wildcards, PUBLISH at QoS 0/1 (delivered at QoS 0), PINGREQ and
+DISCONNECT. It runs its own asyncio loop on a background thread so a rig
+can inject reports with publish() while the firmware runs in the main
+thread. Pass an ssl.SSLContext to serve TLS (the rig uses a throwaway
+self-signed certificate); drop() cuts every client connection, as a
+broker restart would, and can keep refusing new ones for a while. No
+authentication checks.
+"""
+
+import asyncio
+import struct
+import threading
+import time
+
+
+def topic_matches(pattern, topic):
+    p = pattern.split('/')
+    t = topic.split('/')
+    for i, part in enumerate(p):
+        if part == '#':
+            return True
+        if i >= len(t) or (part != '+' and part != t[i]):
+            return False
+    return len(p) == len(t)
+
+
+def _vbi(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+class _Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.subs = []
+        self.client_id = None
+
+
+class FakeBroker:
+    def __init__(self, host='127.0.0.1', port=1883, ssl=None):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.clients = []
+        self.connections = 0
+        self.resumed = 0  # TLS connections that resumed an earlier session
+        self.refused = 0  # Connections closed during a drop() outage
+        self._refuse_until = 0.0
+        self.published = 0  # PUBLISH packets received from clients or publish()
+        self.delivered = 0  # PUBLISH packets sent to subscribers
+        # Optional callable(topic, payload) for every publish a client sends,
+        # e.g. to answer a pushall request.
+        self.on_publish = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def publish(self, topic, payload):
+        """Deliver a message to matching subscribers. Safe from any thread."""
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._loop.call_soon_threadsafe(self._route, topic, payload)
+
+    def drop(self, outage=0.0):
+        """Close every client connection; returns once they are closed.
+
+        New connections are closed straight away for `outage` seconds.
+        """
+        self._refuse_until = time.monotonic() + outage
+
+        async def close_all():
+            for c in self.clients:
+                c.subs.clear()
+                c.writer.close()
+            self.clients.clear()
+        asyncio.run_coroutine_threadsafe(close_all(), self._loop).result()
+
+    def subscribed(self, topic):
+        return any(topic_matches(s, topic) for c in self.clients for s in c.subs)
+
+    def wait_subscribed(self, topic, timeout=30.0):
+        end = time.monotonic() + timeout
+        while not self.subscribed(topic):
+            if time.monotonic() > end:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve, self.host, self.port, ssl=self.ssl))
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        # Stopped: close client connections before the loop goes away.
+        self._server.close()
+        for c in self.clients:
+            c.writer.close()
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._loop.close()
+
+    def _route(self, topic, payload):
+        self.published += 1
+        t = topic.encode()
+        packet = b'\x30' + _vbi(2 + len(t) + len(payload)) + struct.pack('!H', len(t)) + t + payload
+        for c in self.clients:
+            if any(topic_matches(s, topic) for s in c.subs):
+                c.writer.write(packet)
+                self.delivered += 1
+
+    async def _serve(self, reader, writer):
+        if time.monotonic() < self._refuse_until:
+            self.refused += 1
+            writer.close()
+            return
+        client = _Client(reader, writer)
+        self.clients.append(client)
+        self.connections += 1
+        tls = writer.get_extra_info('ssl_object')
+        if tls is not None and tls.session_reused:
+            self.resumed += 1
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length = 0
+                shift = 0
+                while True:
+                    b = (await reader.readexactly(1))[0]
+                    length |= (b & 0x7F) << shift
+                    shift += 7
+                    if not b & 0x80:
+                        break
+                body = await reader.readexactly(length) if length else b''
+                if not self._handle(client, header[0], body):
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if client in self.clients:
+                self.clients.remove(client)
+            writer.close()
+
+    def _handle(self, client, op, body):
+        kind = op & 0xF0
+        w = client.writer
+        if kind == 0x10:  # CONNECT
+            w.write(b'\x20\x02\x00\x00')
+        elif kind == 0x80:  # SUBSCRIBE
+            pid = body[:2]
+            i = 2
+            granted = bytearray()
+            while i < len(body):
+                n = struct.unpack_from('!H', body, i)[0]
+                client.subs.append(body[i + 2:i + 2 + n].decode())
+                i += 2 + n + 1
+                granted.append(0)
+            w.write(b'\x90' + _vbi(2 + len(granted)) + pid + granted)
+        elif kind == 0xA0:  # UNSUBSCRIBE
+            pid = body[:2]
+            i = 2
+            while i < len(body):
+                n = struct.unpack_from('!H', body, i)[0]
+                topic = body[i + 2:i + 2 + n].decode()
+                if topic in client.subs:
+                    client.subs.remove(topic)
+                i += 2 + n
+            w.write(b'\xb0\x02' + pid)
+        elif kind == 0x30:  # PUBLISH
+            n = struct.unpack_from('!H', body, 0)[0]
+            topic = body[2:2 + n].decode()
+            i = 2 + n
+            if op & 0x06:
+                w.write(b'\x40\x02' + body[i:i + 2])
+                i += 2
+            payload = body[i:]
+            self._route(topic, payload)
+            if self.on_publish is not None:
+                self.on_publish(topic, payload)
+        elif kind == 0xC0:  # PINGREQ
+            w.write(b'\xd0\x00')
+        elif kind == 0xE0:  # DISCONNECT
+            return False
+        return True
@@ -0,0 +1,65 @@
+"""Add the MicroPython-only parts of time, asyncio and gc to CPython.
+
+install() must run before any firmware module is imported.
+"""
+
+import asyncio
+import gc
+import time
+import tracemalloc
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+
+def ticks_ms():
+    return int(time.perf_counter() * 1000) & (_TICKS_PERIOD - 1)
+
+
+def ticks_us():
+    return int(time.perf_counter() * 1000000) & (_TICKS_PERIOD - 1)
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & (_TICKS_PERIOD - 1)
+
+
+def ticks_diff(a, b):
+    return ((a - b + _TICKS_HALF) & (_TICKS_PERIOD - 1)) - _TICKS_HALF
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+async def async_sleep_ms(ms):
+    await asyncio.sleep(max(0, ms) / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await asyncio.wait_for(aw, timeout / 1000)
+
+
+def mem_alloc():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def mem_free():
+    return 264 * 1024 - mem_alloc()
+
+
+def install():
+    for name in ('ticks_ms', 'ticks_us', 'ticks_add', 'ticks_diff', 'sleep_ms', 'sleep_us'):
+        if not hasattr(time, name):
+            setattr(time, name, globals()[name])
+    if not hasattr(asyncio, 'sleep_ms'):
+        asyncio.sleep_ms = async_sleep_ms
+    if not hasattr(asyncio, 'wait_for_ms'):
+        asyncio.wait_for_ms = wait_for_ms
+    if not hasattr(gc, 'mem_free'):
+        gc.mem_free = mem_free
+        gc.mem_alloc = mem_alloc
@@ -0,0 +1,53 @@
+"""Host stand-in for MicroPython's machine module."""
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = 0 if value is None else value
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def toggle(self):
+        self._value ^= 1
+
+
+class RTC:
+    def datetime(self, dt=None):
+        import time
+        t = time.gmtime()
+        return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_wday, t.tm_hour, t.tm_min, t.tm_sec, 0)
+
+
+def unique_id():
+    return b'\xe6\x61\x41\x04\x03\x2f\x2a\x2b'
+
+
+def freq(hz=None):
+    return 125000000
+
+
+class ResetError(SystemExit):
+    """Raised instead of rebooting the board."""
+
+
+def reset():
+    raise ResetError("machine.reset()")
+
+
+def soft_reset():
+    raise ResetError("machine.soft_reset()")
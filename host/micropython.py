@@ -0,0 +1,13 @@
+"""Host stand-in for MicroPython's micropython module."""
+
+
+def const(x):
+    return x
+
+
+def mem_info(verbose=None):
+    pass
+
+
+def alloc_emergency_exception_buf(size):
+    pass
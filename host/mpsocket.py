@@ -0,0 +1,49 @@
+"""MicroPython-style socket API on top of CPython sockets.
+
+mqtt_as calls read(), readinto(buf, n) and write() on non-blocking
+sockets and expects None (not an exception) when no data is ready. The
+host runner swaps this module in for mqtt_as's `socket` global.
+"""
+
+import socket as _socket
+import ssl as _ssl
+from socket import AF_INET, SOCK_STREAM, SOCK_DGRAM, getaddrinfo  # noqa: F401
+
+_WOULD_BLOCK = (BlockingIOError, _ssl.SSLWantReadError, _ssl.SSLWantWriteError)
+
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=0):
+        self._s = _socket.socket(af, type, proto)
+        self._timeout = None
+
+    def settimeout(self, t):
+        self._timeout = t
+        self._s.settimeout(t)
+
+    def setblocking(self, flag):
+        self._s.setblocking(flag)
+
+    def connect(self, addr):
+        self._s.connect(addr)
+
+    def read(self, n=-1):
+        try:
+            return self._s.recv(4096 if n < 0 else n)
+        except _WOULD_BLOCK:
+            return None
+
+    def readinto(self, buf, n=None):
+        try:
+            return self._s.recv_into(buf, n or 0)
+        except _WOULD_BLOCK:
+            return None
+
+    def write(self, data):
+        try:
+            return self._s.send(data)
+        except _WOULD_BLOCK:
+            return None
+
+    def close(self):
+        self._s.close()
@@ -0,0 +1,57 @@
+"""Host stand-in for MicroPython's ssl module, over host/mpsocket.py sockets.
+
+SSLContext mimics MicroPython's closely enough for main.py
+(PROTOCOL_TLS_CLIENT, verify_mode); like CPython's it also takes and
+exposes a session, so mqtt_as's TLS resumption can be tested. The host
+runner installs this module as `ssl` only after asyncio and the fake
+broker have imported the real one.
+"""
+
+import select
+import ssl as _ssl
+from ssl import PROTOCOL_TLS_CLIENT, CERT_NONE, CERT_OPTIONAL, CERT_REQUIRED  # noqa: F401
+
+from mpsocket import socket
+
+
+class _TLSSocket(socket):
+    def __init__(self, tls, timeout):
+        self._s = tls
+        self._timeout = timeout
+
+    @property
+    def session(self):
+        return self._s.session
+
+    @property
+    def session_reused(self):
+        return self._s.session_reused
+
+
+class SSLContext:
+    def __init__(self, protocol=PROTOCOL_TLS_CLIENT):
+        self._ctx = _ssl.SSLContext(protocol)
+        self._ctx.check_hostname = False
+        self._ctx.verify_mode = _ssl.CERT_NONE
+
+    @property
+    def verify_mode(self):
+        return self._ctx.verify_mode
+
+    @verify_mode.setter
+    def verify_mode(self, mode):
+        self._ctx.verify_mode = mode
+
+    def wrap_socket(self, sock, server_hostname=None, session=None):
+        """Handshake over a (possibly still connecting) non-blocking socket.
+
+        Blocks until the handshake is done, as MicroPython's does.
+        """
+        raw = sock._s
+        if not select.select([], [raw], [], sock._timeout or 10)[1]:
+            raise OSError(-1, "TLS connect timed out")
+        raw.setblocking(True)
+        raw.settimeout(sock._timeout or 10)
+        tls = self._ctx.wrap_socket(raw, server_hostname=server_hostname, session=session)
+        tls.setblocking(False)
+        return _TLSSocket(tls, sock._timeout)
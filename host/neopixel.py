@@ -0,0 +1,44 @@
+"""Host stand-in for MicroPython's neopixel module that records frames."""
+
+import time
+
+
+class NeoPixel:
+    ORDER = (1, 0, 2, 3)
+    # Shared by every strip so a test rig can inspect output without a handle.
+    instances = []
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.writes = 0
+        self.frames = []  # (perf_counter, bytes) of the most recent writes
+        self.keep = 256
+        self.on_write = None  # Optional callable(strip) after every write
+        NeoPixel.instances.append(self)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for c in range(self.bpp):
+            self.buf[offset + self.ORDER[c]] = v[c]
+
+    def __getitem__(self, i):
+        offset = i * self.bpp
+        return tuple(self.buf[offset + self.ORDER[c]] for c in range(self.bpp))
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        self.writes += 1
+        self.frames.append((time.perf_counter(), bytes(self.buf)))
+        if len(self.frames) > self.keep:
+            del self.frames[0]
+        if self.on_write is not None:
+            self.on_write(self)
@@ -0,0 +1,57 @@
+"""Host stand-in for MicroPython's network module.
+
+Wi-Fi is up from the start unless a rig sets WLAN.connect_delay, in which
+case the link comes up that many seconds after the first connect(). The
+link state is shared by every WLAN object, as on the board.
+"""
+
+import time
+
+STA_IF = 0
+AP_IF = 1
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    connect_delay = 0.0
+    _connected = None
+    _up_at = None
+
+    def __init__(self, interface=STA_IF):
+        self._active = False
+        if WLAN._connected is None:
+            WLAN._connected = WLAN.connect_delay <= 0
+
+    def active(self, state=None):
+        if state is None:
+            return self._active
+        self._active = bool(state)
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        if WLAN._up_at is None:
+            WLAN._up_at = time.monotonic() + WLAN.connect_delay
+
+    def disconnect(self):
+        WLAN._connected = False
+        WLAN._up_at = None
+
+    def isconnected(self):
+        if not WLAN._connected and WLAN._up_at is not None and time.monotonic() >= WLAN._up_at:
+            WLAN._connected = True
+        return WLAN._connected
+
+    def status(self, param=None):
+        if self.isconnected():
+            return STAT_GOT_IP
+        return STAT_IDLE if WLAN._up_at is None else STAT_CONNECTING
+
+    def config(self, *args, **kwargs):
+        return None
+
+    def ifconfig(self, cfg=None):
+        return ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
@@ -0,0 +1,425 @@
+"""Run the real main.py end-to-end on a Linux host.
+
+The stand-in modules in this directory (machine, neopixel, network,
+micropython) shadow the MicroPython ones, host/compat.py adds
+the MicroPython-only time/asyncio/gc functions, and mqtt_as talks through
+host/mpsocket.py. By default an in-process FakeBroker plays the printer:
+it answers pushall with a captured report and then publishes mc_percent
+deltas, while the rig measures message-to-LED latency (publish to the
+first NeoPixel.write() showing a new frame) and CPU time.
+
+With --printers N the firmware watches N printers, each driving its own
+slice of the strip. Every printer gets its own broker (and so its own
+MQTT connection) unless --shared puts them all behind one broker. The
+rig also counts paced frames, so running with an animated --state shows
+how many printers the render loop can track while holding its frame rate:
+
+    python host/run.py --duration 20 --leds 300
+    python host/run.py --settings my_settings.json --no-broker --verbose
+    python host/run.py --printers 8 --state IDLE --interval 0.2
+
+--wifi-ms models Wi-Fi association time; first_write_ms and status_ms
+then show how soon the strip lights up and how soon it shows the state
+from the pushall answer.
+
+--tls serves MQTT over TLS with a throwaway self-signed certificate (needs
+the openssl command), as the printers do. --drop-every S cuts every broker
+connection each S seconds; reconnect_ms is the time from the drop until
+the firmware has subscribed again, and tls_resumed counts reconnects that
+resumed the previous TLS session. --outage-ms keeps the broker refusing
+connections for that long after each drop, to exercise reconnect backoff:
+
+    python host/run.py --tls --drop-every 3 --duration 20
+    python host/run.py --drop-every 10 --outage-ms 4000 --duration 30
+
+The firmware runs in a fresh temporary directory unless --workdir names
+one; reusing it keeps the state snapshot (state.json) between runs, so a
+second run shows the restored state from its first frame and skips
+pushall while the snapshot is recent (pushall_requests):
+
+    python host/run.py --workdir /tmp/rgb --duration 10
+    python host/run.py --workdir /tmp/rgb --duration 10
+
+--metrics-s N has the firmware publish its metrics snapshot every N
+seconds to METRICS_TOPIC on the (first) broker instead of printing it;
+the summary counts the snapshots and their average size. --log-dump
+records debug-level logs and asks for the log ring over MQTT (log_topic)
+a second before the end, saving it to log.txt in the working directory.
+
+A local SNTP responder answers the firmware's time sync; ntp_queries
+counts the requests it served.
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import _thread
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HOST)
+if HOST not in sys.path:
+    sys.path.insert(0, HOST)
+sys.path.insert(1, ROOT)
+
+import compat  # noqa: E402
+
+compat.install()
+
+import mpsocket  # noqa: E402
+import mpssl  # noqa: E402
+import neopixel  # noqa: E402
+import network  # noqa: E402
+from broker import FakeBroker  # noqa: E402
+
+METRICS_TOPIC = 'printer-rgb/host/metrics'
+LOG_TOPIC = 'printer-rgb/host/log'
+
+
+class BootProbe:
+    """Times the first strip write and the first new frame after pushall was answered."""
+    def __init__(self, start):
+        self.start = start
+        self.answered = None
+        self.pushalls = 0
+        self.metrics = []  # Sizes of published metrics snapshots
+        self.log = None  # Log ring text published on request
+        self.first_write = None
+        self.status = None
+
+    def on_write(self, strip):
+        t = strip.frames[-1][0]
+        if self.first_write is None:
+            self.first_write = t
+        if self.status is None and self.answered is not None and len(strip.frames) > 1 \
+                and strip.frames[-1][1] != strip.frames[-2][1]:
+            self.status = t
+
+    def ms(self, t):
+        return round((t - self.start) * 1000, 1) if t is not None else None
+
+
+class LatencyProbe:
+    """Pairs published reports with the next strip write that changes the frame."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.latencies = []
+        self._last = None
+
+    def published(self):
+        with self.lock:
+            self.pending.append(time.perf_counter())
+
+    def on_write(self, strip):
+        t, frame = strip.frames[-1]
+        if frame == self._last:
+            return
+        self._last = frame
+        with self.lock:
+            if self.pending:
+                self.latencies.append(t - self.pending[0])
+                self.pending.clear()
+
+
+class FrameCounter:
+    """Counts frames paced by the firmware's FrameScheduler, across its stat resets."""
+    def __init__(self):
+        self.frames = 0
+        self.dropped = 0
+        self.first = None
+        self.scheduler = None
+
+    def install(self):
+        from output.scheduler import FrameScheduler
+        counter = self
+        wait = FrameScheduler.wait
+        reset_stats = FrameScheduler.reset_stats
+
+        async def counted_wait(sched):
+            counter.scheduler = sched
+            if counter.first is None:
+                counter.first = time.perf_counter()
+            counter.frames += 1
+            await wait(sched)
+
+        def counted_reset(sched):
+            counter.dropped += sched.dropped
+            reset_stats(sched)
+        FrameScheduler.wait = counted_wait
+        FrameScheduler.reset_stats = counted_reset
+
+    def rate(self, end):
+        if self.first is None or end <= self.first:
+            return 0.0
+        return self.frames / (end - self.first)
+
+    def total_dropped(self):
+        return self.dropped + (self.scheduler.dropped if self.scheduler else 0)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def feed(targets, args, probe, stop):
+    """Publish mc_percent deltas to every (broker, topic) once main.py has subscribed."""
+    for broker, topic in targets:
+        if not broker.wait_subscribed(topic):
+            return
+    time.sleep(args.settle)
+    percent = 0
+    while not stop.is_set():
+        percent = (percent + 7) % 100
+        probe.published()
+        for broker, topic in targets:
+            broker.publish(topic, json.dumps({"print": {"mc_percent": percent, "command": "push_status"}}))
+        stop.wait(args.interval)
+
+
+def drop(brokers, targets, args, outages, stop):
+    """Cut every connection each --drop-every seconds and time the recovery."""
+    for broker, topic in targets:
+        if not broker.wait_subscribed(topic):
+            return
+    while not stop.wait(args.drop_every):
+        for broker in brokers:
+            broker.drop(args.outage_ms / 1000)
+        t0 = time.perf_counter()
+        while not all(broker.subscribed(topic) for broker, topic in targets):
+            if stop.wait(0.002):
+                return
+        outages.append(time.perf_counter() - t0)
+
+
+def ntp_server(stop, counter):
+    """Answer SNTP requests on a free local UDP port with the host's time. Returns the port."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(('127.0.0.1', 0))
+    s.settimeout(0.2)
+
+    def serve():
+        while not stop.is_set():
+            try:
+                _, addr = s.recvfrom(48)
+            except socket.timeout:
+                continue
+            reply = bytearray(48)
+            reply[0] = 0x1C  # Version 3, server mode
+            struct.pack_into('!I', reply, 40, int(time.time()) + 2208988800)
+            s.sendto(reply, addr)
+            counter.append(addr)
+        s.close()
+    threading.Thread(target=serve, daemon=True).start()
+    return s.getsockname()[1]
+
+
+def server_context(workdir):
+    """TLS context with a fresh self-signed certificate, for the fake brokers."""
+    cert = os.path.join(workdir, 'broker.pem')
+    key = os.path.join(workdir, 'broker.key')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+                    '-nodes', '-days', '1', '-subj', '/CN=printer', '-keyout', key, '-out', cert],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--settings', help='settings.json to run with (default: generated)')
+    parser.add_argument('--leds', type=int, default=300)
+    parser.add_argument('--port', type=int, default=0, help='fake broker port (0 picks a free one)')
+    parser.add_argument('--no-broker', action='store_true', help='use the broker named in --settings')
+    parser.add_argument('--report', default=os.path.join(ROOT, 'bench', 'reports', 'pushall.json'),
+                        help='report sent in answer to pushall')
+    parser.add_argument('--state', help='override gcode_state in that report, e.g. IDLE for an animated pattern')
+    parser.add_argument('--printers', type=int, default=1, help='printers to watch, each on its own segment')
+    parser.add_argument('--shared', action='store_true', help='put every printer behind one broker')
+    parser.add_argument('--wifi-ms', type=float, default=0, help='simulated Wi-Fi association time')
+    parser.add_argument('--tls', action='store_true', help='serve MQTT over TLS')
+    parser.add_argument('--drop-every', type=float, default=0, help='seconds between dropped connections')
+    parser.add_argument('--outage-ms', type=float, default=0, help='broker down time after each drop')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between deltas')
+    parser.add_argument('--settle', type=float, default=2.0, help='seconds to wait after subscribe')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--metrics-s', type=int, default=0, help='publish metrics every N seconds')
+    parser.add_argument('--log-dump', action='store_true', help='fetch the debug log over MQTT at the end')
+    parser.add_argument('--workdir', help='directory to run in, kept between runs')
+    parser.add_argument('--verbose', action='store_true', help='show firmware output')
+    parser.add_argument('--json', help='write the summary to this file')
+    args = parser.parse_args()
+
+    if args.settings:
+        with open(args.settings) as f:
+            settings = json.load(f)
+    else:
+        settings = {"serial": "HOST0001", "num_leds": args.leds, "ssid": "host", "wifi_password": ""}
+        if args.printers > 1:
+            n = args.printers
+            settings["printers"] = [{"serial": f"HOST{i + 1:04d}"} for i in range(n)]
+            settings["segments"] = [{"name": f"p{i}", "printer": i,
+                                     "ranges": [[0, args.leds * i // n, args.leds * (i + 1) // n - args.leds * i // n]]}
+                                    for i in range(n)]
+    specs = settings.get("printers") or [settings]
+    workdir = args.workdir or tempfile.mkdtemp(prefix='printer-rgb-')
+    os.makedirs(workdir, exist_ok=True)
+    brokers = []
+    if not args.no_broker:
+        settings.update({"mqtt_tls": args.tls})
+        tls = server_context(workdir) if args.tls else None
+        for i in range(1 if args.shared else len(specs)):
+            brokers.append(FakeBroker(port=args.port + i if args.port else 0, ssl=tls).start())
+        settings.update({"mqtt_ip": brokers[0].host, "mqtt_port": brokers[0].port})
+        if not args.shared:
+            for spec, broker in zip(specs, brokers):
+                spec.update({"mqtt_ip": broker.host, "mqtt_port": broker.port})
+    serials = [spec.get("serial", settings.get("serial", "none")) for spec in specs]
+    if args.metrics_s:
+        settings.update({"metrics_topic": METRICS_TOPIC, "metrics_interval_s": args.metrics_s})
+    if args.log_dump:
+        settings.update({"log_topic": LOG_TOPIC, "log_level": "debug"})
+    stop = threading.Event()
+    ntp_queries = []
+    if not args.no_broker:
+        settings.update({"ntp_host": "127.0.0.1", "ntp_port": ntp_server(stop, ntp_queries)})
+
+    with open(os.path.join(workdir, 'settings.json'), 'w') as f:
+        json.dump(settings, f)
+    os.chdir(workdir)
+
+    import modules.mqtt_as as mqtt_as
+    mqtt_as.socket = mpsocket
+    # MicroPython's memoryview accepts str (topics, credentials); CPython's does not.
+    mqtt_as.memoryview = lambda obj: memoryview(obj.encode() if isinstance(obj, str) else obj)
+    # main.py's `import ssl` gets the MicroPython-style module; asyncio and
+    # the brokers already hold the real one.
+    sys.modules['ssl'] = mpssl
+
+    network.WLAN.connect_delay = args.wifi_ms / 1000
+    probe = LatencyProbe()
+    boot = BootProbe(time.perf_counter())
+    frames = FrameCounter()
+    frames.install()
+    outages = []
+    if brokers:
+        with open(args.report, 'rb') as f:
+            report = f.read()
+        if args.state:
+            data = json.loads(report)
+            data["print"]["gcode_state"] = args.state
+            report = json.dumps(data).encode()
+
+        def answer(broker):
+            def on_publish(t, payload):
+                if t == METRICS_TOPIC:
+                    boot.metrics.append(len(payload))
+                elif t == LOG_TOPIC:
+                    boot.log = payload.decode()
+                if t.endswith('/request') and b'pushall' in payload:
+                    boot.pushalls += 1
+                    if boot.answered is None:
+                        boot.answered = time.perf_counter()
+                    broker.publish(t[:-len('request')] + 'report', report)
+            return on_publish
+        targets = []
+        for i, serial in enumerate(serials):
+            broker = brokers[0] if args.shared else brokers[i]
+            targets.append((broker, f"device/{serial}/report"))
+        for broker in brokers:
+            broker.on_publish = answer(broker)
+        threading.Thread(target=feed, args=(targets, args, probe, stop), daemon=True).start()
+        if args.log_dump:
+            threading.Timer(max(0, args.duration - 1), brokers[0].publish, (LOG_TOPIC + '/get', b'')).start()
+        if args.drop_every:
+            threading.Thread(target=drop, args=(brokers, targets, args, outages, stop), daemon=True).start()
+
+    original_init = neopixel.NeoPixel.__init__
+
+    def init(self, *a, **kw):
+        original_init(self, *a, **kw)
+
+        def on_write(strip):
+            boot.on_write(strip)
+            probe.on_write(strip)
+        self.on_write = on_write
+    neopixel.NeoPixel.__init__ = init
+
+    timer = threading.Timer(args.duration, _thread.interrupt_main)
+    timer.start()
+    stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, 'w')
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    try:
+        import runpy
+        runpy.run_path(os.path.join(ROOT, 'main.py'), run_name='__main__')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        timer.cancel()
+        stop.set()
+        sys.stdout = stdout
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    strips = neopixel.NeoPixel.instances
+    summary = {
+        'printers': len(serials),
+        'connections': len(brokers),
+        'duration_s': round(wall, 2),
+        'cpu_s': round(cpu, 2),
+        'cpu_share': round(cpu / wall, 3) if wall else 0,
+        'first_write_ms': boot.ms(boot.first_write),
+        'status_ms': boot.ms(boot.status),
+        'pushall_requests': boot.pushalls,
+        'ntp_queries': len(ntp_queries),
+        'metrics_published': len(boot.metrics),
+        'metrics_bytes': sum(boot.metrics) // len(boot.metrics) if boot.metrics else 0,
+        'frames_per_s': round(frames.rate(wall0 + wall), 1),
+        'frames_dropped': frames.total_dropped(),
+        'strip_writes': sum(s.writes for s in strips),
+        'reports_published': sum(b.published for b in brokers),
+        'latency_samples': len(probe.latencies),
+        'latency_ms_min': round(min(probe.latencies, default=0) * 1000, 2),
+        'latency_ms_p50': round(percentile(probe.latencies, 0.5) * 1000, 2),
+        'latency_ms_p95': round(percentile(probe.latencies, 0.95) * 1000, 2),
+        'latency_ms_max': round(max(probe.latencies, default=0) * 1000, 2),
+    }
+    if args.drop_every:
+        summary.update({
+            'reconnects': len(outages),
+            'reconnect_ms_p50': round(percentile(outages, 0.5) * 1000, 1),
+            'reconnect_ms_max': round(max(outages, default=0) * 1000, 1),
+            'tls_resumed': sum(b.resumed for b in brokers),
+            'refused': sum(b.refused for b in brokers),
+        })
+    if args.log_dump:
+        summary['log_lines'] = len(boot.log.splitlines()) if boot.log else 0
+        if boot.log:
+            with open(os.path.join(workdir, 'log.txt'), 'w') as f:
+                f.write(boot.log)
+            summary['log_file'] = os.path.join(workdir, 'log.txt')
+    for k, v in summary.items():
+        print(f"{k:<20} {v}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=1)
+    for broker in brokers:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,4 @@
 from machine import Pin, RTC
-from patterns.finish import Finish
-from patterns.paused import Paused
-from patterns.progress import Progress
 from modules.mqtt_as import MQTTClient, config
 # from modules.umqtt.simple import MQTTClient
 import ssl
@@ -12,258 +9,433 @@ import neopixel
 import machine
 import network
 import asyncio
-import ntptime
-from patterns.idle import Idle
-from patterns.error import Error
-from patterns.prepare import Prepare
+from patterns.bake import BakeCache
+from patterns.registry import PatternRegistry
+from patterns.declarative import compile_pattern
+from patterns.compositor import Compositor, BLEND_MAX
+from output.scheduler import FrameScheduler
+from output.pipeline import ColorPipeline
+from output.layout import Layout, parse_layout
+from printer.report import ReportExtractor
+from printer.snapshot import StateStore, age_s
+from runtime.metrics import Metrics, BYTE_BUCKETS
+from runtime.supervisor import Supervisor
+from runtime.gcpacer import GCPacer
+from runtime import log
+from runtime import ntp
+from printer.state import (parse_printers, F_ALL, F_PROGRESS, GCODE_RUNNING, GCODE_FAILED, GCODE_IDLE,
+                           GCODE_PAUSE, GCODE_FINISH, GCODE_PREPARE)
+
+boot_ms = time.ticks_ms()
+startup_ms = {}  # Startup stage: ms since boot_ms
+
+def log_stage(name):
+    startup_ms[name] = time.ticks_diff(time.ticks_ms(), boot_ms)
+    log.info("Startup: %s after %d ms", name, startup_ms[name])
 
 with open('settings.json', 'r') as f:
     settings = json.load(f)
 
+# Records go to a RAM ring (log.dump() from the REPL, or log_topic/get over
+# MQTT); only log_echo and above are also printed as they happen.
+log.configure(log.level_from_name(settings.get("log_level", "info")),
+              log.level_from_name(settings.get("log_echo", "warn"), log.WARN),
+              settings.get("log_size", 4096))
+
 debug_led = Pin('LED', Pin.OUT)
 
-serial = settings.get("serial", "none")
-num_leds = settings.get("num_leds", 64)
-led_pin = settings.get("led_pin", 0)
-mqtt_ip = settings.get("mqtt_ip", "192.168.1.117")
-current_pattern = Idle()
-frame_count = 0
+fps = settings.get("fps", 100)
+bake_cache = BakeCache(settings.get("bake_budget", 16384), fps)
 
-hms = []
-printer_chamber_light_on = False
-gcode = "IDLE"
-progress = 0
-stage = 0
+printers = parse_printers(settings)
+printers_by_topic = {p.topic.encode(): p for p in printers}
+# Show the last known state from the first frame; the network catches up.
+state_store = StateStore(settings.get("state_file", "state.json"), settings.get("state_write_s", 30) * 1000)
+log.info("Restored state for %d printers", state_store.load(printers))
+# At boot, ask for a full report only if the restored state is older than this.
+pushall_after_s = settings.get("pushall_after_s", 60)
 
-main_thread_rgb_lock = True
+# Set by the first report; the next frame is logged as the first status frame.
+status_frame_due = False
+# Set by sub_cb when a printer's tracked fields change (and by the
+# supervisor when a printer goes on- or offline); the render task selects
+# patterns only then.
+state_changed = asyncio.Event()
+state_changed.set()
 
-np = neopixel.NeoPixel(machine.Pin(led_pin), num_leds)
+# Brightness, white balance, gamma and color order are applied to the whole
+# frame by the output stage, so patterns always render full-range colors.
+pipeline = ColorPipeline(settings.get("color_order", "GRB"), settings.get("brightness", 1.0),
+                         settings.get("gamma", 1.0), settings.get("white_balance", (1.0, 1.0, 1.0, 1.0)),
+                         settings.get("extract_white", True))
+# Byte offset of each color channel in a strip buffer, used by Pattern.render_into().
+np_order = pipeline.order
+scheduler = FrameScheduler(fps)
+
+# Everything worth watching on a headless board, snapshotted every
+# metrics_interval_s and published to metrics_topic (or printed if unset).
+metrics = Metrics()
+metrics.add("render_us", scheduler.render)
+metrics.add("write_us", scheduler.write)
+metrics.add("late_us", scheduler.lateness)
+frames = metrics.counter("frames")
+transition_us = metrics.histogram("transition_us")
+msg_bytes = metrics.histogram("msg_bytes", BYTE_BUCKETS)
+parse_us = metrics.histogram("parse_us")
+# Collections are paced into frame slack instead of run every second.
+pacer = GCPacer(settings.get("gc_alloc_threshold", 16384), settings.get("gc_low_water", 24576))
+metrics.add("gc_us", pacer.pauses)
+metrics.gauge("gc_runs", lambda: pacer.collections)
+metrics.gauge("gc_deferred", lambda: pacer.deferred)
+metrics.gauge("mem_free", gc.mem_free)
+metrics.gauge("frames_dropped", lambda: scheduler.dropped)  # In this window
+
+# Pattern modules are imported on first use and their instances reused.
+patterns = PatternRegistry()
+metrics.gauge("pattern_imports", lambda: patterns.imports)
+metrics.gauge("pattern_drops", lambda: patterns.drops)
+# Patterns defined in settings.json replace built-ins of the same name.
+for name, spec in settings.get("patterns", {}).items():
+    try:
+        patterns.register(name, compile_pattern(name, spec))
+    except (ValueError, TypeError) as e:
+        log.warn("Ignoring pattern %s: %s", name, e)
+
+# Segments named "status" follow the printer state; the rest show a fixed pattern.
+outputs, segments = parse_layout(settings)
+layout = Layout([neopixel.NeoPixel(machine.Pin(pin), n, bpp=pipeline.bpp) for pin, n in outputs],
+                segments, pipeline.bpp)
+metrics.gauge("strip_writes", lambda: sum(w.written for w in layout.writers))
+metrics.gauge("strip_skips", lambda: sum(w.skipped for w in layout.writers))
+for seg in segments:
+    if seg.pattern == "status":
+        if seg.printer >= len(printers):
+            log.warn("No printer %d for segment %s", seg.printer, seg.name)
+            continue
+        seg.source = Compositor(seg.num_leds, pipeline.bpp, bake_cache, settings.get("crossfade_ms", 400))
+        printers[seg.printer].displays.append(seg)
+    elif seg.pattern in patterns:
+        seg.source = Compositor(seg.num_leds, pipeline.bpp, bake_cache, 0)
+        seg.source.transition(patterns.get(seg.pattern, seg))
+    else:
+        log.warn("Unknown pattern for segment %s: %s", seg.name, seg.pattern)
+# Still connected (its reports feed the log and state store), just not shown.
+for i, printer in enumerate(printers):
+    if not printer.displays:
+        log.warn("Printer %d (%s) drives no status segment", i, printer.serial)
 
 wlan = network.WLAN(network.STA_IF)
 wlan.active(True)
-def connect_to_wifi():
-    if not wlan.isconnected():
-        print('Connecting to network: ' + settings.get("ssid", "") + ":" + settings.get("wifi_password", ""))
-        wlan.connect(settings.get("ssid", ""), settings.get("wifi_password", ""))
-        time.sleep(5)
-        for _ in range(2):
-            if wlan.isconnected():
-                break
-            wlan.connect(settings.get("ssid", ""), settings.get("wifi_password", ""))
-            time.sleep(5)
-        if not wlan.isconnected():
-            return False
-    print('Network config:', wlan.ifconfig())
-    return True
-
-if not connect_to_wifi():
-    print("Failed to connect to WiFi, restarting...")
-    for _ in range(5):
-        debug_led.toggle()
-        for i in range(num_leds):
-            np[i] = (255, 0, 0)
-        np.write()
-        time.sleep(1.0)
-        for i in range(num_leds):
-            np[i] = (0, 0, 0)
-        np.write()
-        time.sleep(1.0)
-    machine.reset()
-
-rtc = RTC()
-ntptime.settime()
-print("Current time (UTC):", rtc.datetime())
-start_time = time.ticks_ms()
+# Wi-Fi and broker connections are retried with backoff while the render
+# task keeps animating; printers whose connection is down show "offline".
+supervisor = Supervisor(wlan, settings.get("ssid", ""), settings.get("wifi_password", ""), state_changed.set,
+                        settings.get("backoff_ms", 500), settings.get("backoff_max_ms", 60000))
 
-def sub_cb(_, msg, __):
-    data = msg.decode('utf-8')
-    if "print" not in data:
-        print(f"Encountered message with size of: {len(data)}, but print object not present, ignoring.")
-    else:
-        print(f"Got message with size of: {len(data)}, parsing.")
+async def sync_time():
+    """Set the RTC over NTP. Nothing on the LED path needs wall time, so this runs last."""
     try:
-        data_dict = json.loads(data)
-    except:
-        print("Failed to parse JSON")
+        # Non-blocking apart from the first DNS lookup of ntp_host (see runtime/ntp.py).
+        await ntp.settime(settings.get("ntp_host", "pool.ntp.org"), settings.get("ntp_port", 123),
+                          settings.get("ntp_timeout_ms", 2000))
+    except OSError as e:
+        log.warn("NTP failed: %s", e)
         return
+    log_stage("ntp")
+    log.info("Current time (UTC): %s", RTC().datetime())
 
-    try:
-        light_status = data_dict["print"]["lights_report"][0]["mode"]
-        global printer_chamber_light_on 
-        if light_status == "on":
-            printer_chamber_light_on = True
-        else:
-            printer_chamber_light_on = False
-    except KeyError:
-        pass
+start_time = time.ticks_ms()
+report_extractor = ReportExtractor()
 
+def sub_cb(topic, msg, _):
+    # msg is a memoryview into mqtt_as's buffer for this topic (config["msg_view"]):
+    # it is only valid during this call, so only extracted values may outlive it.
+    global status_frame_due
+    printer = printers_by_topic.get(topic)
+    if printer is None:
+        if topic == log_request:
+            asyncio.create_task(publish_log())
+        return
+    log.debug("Got message for %s with size of %d", printer.serial, len(msg))
+    msg_bytes.record(len(msg))
+    t0 = time.ticks_us()
     try:
-        global hms
-        hms = data_dict["print"]["hms"]
-    except KeyError:
-        pass
+        fields = report_extractor.extract(msg)
+    except ValueError:
+        log.warn("Failed to parse report from %s", printer.serial)
+        return
+    parse_us.record(time.ticks_diff(time.ticks_us(), t0))
+    if not fields:
+        log.debug("Print object not present, ignoring")
+        return
 
-    try:
-        global gcode
-        gcode = data_dict["print"]["gcode_state"]
-    except KeyError:
-        pass
+    printer.link.reported()
+    printer.report_ms = time.ticks_ms()
+    if not printer.reported:
+        # Leave Connecting even if the report matches the defaults.
+        printer.reported = True
+        printer.state.changed |= F_ALL
+        status_frame_due = "status" not in startup_ms
+    if printer.state.merge(fields):
+        state_changed.set()
+        state_store.changed()
 
-    
-    try:
-        global progress
-        progress = int(data_dict["print"]["mc_percent"])
-    except KeyError:
-        pass
+def select_pattern(printer, changed):
+    """Update one printer's segments for the fields in the `changed` bitmask."""
+    state = printer.state
+    if changed & F_PROGRESS:
+        progress = state.progress / 100.0
+        for seg in printer.displays:
+            seg.progress = progress
+            seg.dirty = True
+    if not changed & ~F_PROGRESS:
+        return
 
-    try:
-        global stage
-        stage = int(data_dict["print"]["stg_cur"])
-    except KeyError:
-        pass
+    base, overlay = None, None
+    gcode = state.gcode
+    if not (printer.reported or printer.restored):
+        base = 'connecting'
+    elif not state.online and printer.reported:
+        # Only this printer's connection is down; the others keep running.
+        base = 'offline'
+    elif state.light:
+        if gcode == GCODE_RUNNING and state.stage == 0:
+            base = 'progress'
+            if len(state.hms) > 0:
+                # Keep the bar visible and pulse the HMS warning over it.
+                overlay = 'error'
+        elif len(state.hms) > 0 or gcode == GCODE_FAILED:
+            base = 'error'
+        elif gcode == GCODE_IDLE:
+            base = 'idle'
+        elif gcode == GCODE_PAUSE:
+            base = 'paused'
+        elif gcode == GCODE_FINISH:
+            base = 'finish'
+        elif state.stage != 0 or gcode == GCODE_PREPARE:
+            base = 'prepare'
 
-    del data_dict
-    del data
-    gc.collect()
+    if base == printer.pattern and overlay == printer.overlay:
+        return
+    printer.pattern = base
+    printer.overlay = overlay
+    t0 = time.ticks_us()
+    # Every status segment gets its own instances: patterns keep per-strip state.
+    for seg in printer.displays:
+        overlays = ((patterns.get(overlay, seg), BLEND_MAX, 256),) if overlay else ()
+        seg.source.transition(patterns.get(base, seg) if base else None, overlays)
+        seg.dirty = True
+    transition_us.record(time.ticks_diff(time.ticks_us(), t0))
+    log.info("Pattern for %s: %s %s", printer.serial, base, overlay)
 
 async def update_pattern():
+    global status_frame_due
     while True:
-        pattern_changed = False
-        global main_thread_rgb_lock
-        if main_thread_rgb_lock:
-            await asyncio.sleep_ms(10)
-            continue
-        global current_pattern
-        if (len(hms) > 0 or gcode == "FAILED") and printer_chamber_light_on:
-            if not isinstance(current_pattern, Error):
-                current_pattern = Error()
-                pattern_changed = True
-        elif gcode == "RUNNING" and stage == 0 and printer_chamber_light_on:
-            if not isinstance(current_pattern, Progress):
-                current_pattern = Progress()
-                pattern_changed = True
-        elif gcode == "IDLE" and printer_chamber_light_on:
-            if not isinstance(current_pattern, Idle):
-                current_pattern = Idle()
-                pattern_changed = True
-        elif gcode == "PAUSE" and printer_chamber_light_on:
-            if not isinstance(current_pattern, Paused):
-                current_pattern = Paused()
-                pattern_changed = True
-        elif gcode == "FINISH" and printer_chamber_light_on:
-            if not isinstance(current_pattern, Finish):
-                current_pattern = Finish()
-                pattern_changed = True
-        elif (stage != 0 or gcode == "PREPARE") and printer_chamber_light_on:
-            if not isinstance(current_pattern, Prepare):    
-                current_pattern = Prepare() 
-                pattern_changed = True
-        else:
-            current_pattern = None
-            pattern_changed = True
-
-        if pattern_changed and current_pattern:
-            global num_leds
-            current_pattern.num_leds = num_leds
-            print("Pattern changed")
-
-        if current_pattern:
-            global progress
-            now = (time.ticks_diff(start_time, time.ticks_ms())) / 1000
-            print(now)
-            current_pattern.update(now, progress / 100.0)
-            if current_pattern.all_same:
-                color = current_pattern.at(0)
-                for i in range(num_leds):
-                    np[i] = color
-                np.write()
-            else:
-                for i in range(num_leds):
-                    color = current_pattern.at(i)
-                    np[i] = color
-                np.write()
-        else:
-            for i in range(num_leds):
-                np[i] = (0, 0, 0)
-            np.write()
+        if state_changed.is_set():
+            state_changed.clear()
+            for printer in printers:
+                changed = printer.state.take()
+                if changed:
+                    select_pattern(printer, changed)
 
-        global frame_count
-        frame_count += 1
-        # print("Memory:", gc.mem_free(), "Frames:", frame_count)
-        await asyncio.sleep_ms(10)
+        t0 = time.ticks_us()
+        now = (time.ticks_diff(time.ticks_ms(), start_time)) / 1000
+        touched = layout.render(now, np_order)
+        t1 = time.ticks_us()
+        scheduler.render.record(time.ticks_diff(t1, t0))
+        if touched and layout.flush(touched, pipeline):
+            scheduler.write.record(time.ticks_diff(time.ticks_us(), t1))
+        frames.inc()
+        pacer.after_frame(scheduler.slack_us() if layout.animated else None)
+        if status_frame_due and touched:
+            status_frame_due = False
+            log_stage("status")
 
-context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-context.verify_mode = ssl.CERT_NONE
+        if not layout.animated:
+            # Static or dark output: nothing to do until a report changes it.
+            await state_changed.wait()
+            scheduler.resync()
+        else:
+            await scheduler.wait()
 
-topic = f'device/{serial}/report'
+# The printer's broker uses TLS on 8883; mqtt_port/mqtt_tls (top-level or
+# per printer) allow pointing at a plain local broker (e.g. host/run.py).
+if any(p.tls for p in printers):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.verify_mode = ssl.CERT_NONE
+else:
+    context = False
 
-config["server"] = mqtt_ip
-config["port"] = 8883
 config["wifi_pw"] = settings.get("wifi_password", "")
 config["ssid"] = settings.get("ssid", "")
-config["ssl"] = context
-config["password"] = settings.get("lan_access_code", "")
 config["user"] = 'bblp'
 config["subs_cb"] = sub_cb
+# sub_cb parses straight out of mqtt_as's read buffer and keeps no reference to it.
+config["msg_view"] = True
 config["keepalive"] = 3600
+config["log"] = log
+# Off by default: coalescing copies every payload into a per-topic buffer,
+# where direct delivery parses it in place (see msg_view above).
+coalesce = settings.get("mqtt_coalesce", False)
+# Free heap below which unused pattern modules are dropped.
+low_memory = settings.get("low_memory", 32768)
+
+PUSHALL = '{"pushing":{"sequence_id": "0", "command": "pushall"}}'
+
+metrics_topic = settings.get("metrics_topic", "")
+metrics_interval = settings.get("metrics_interval_s", 10)
+# Publishing anything to log_topic/get has the log ring published to log_topic.
+log_topic = settings.get("log_topic", "")
+log_request = (log_topic + "/get").encode() if log_topic else None
+# The link that carries metrics and log requests, set by make_links().
+status_link = None
+
+async def publish_log():
+    if status_link.up:
+        await status_link.client.publish(log_topic, log.text())
+
+def log_metrics(snapshot):
+    """Log a metrics snapshot as short key=value records (no metrics_topic).
+
+    The ring cuts string arguments at 120 bytes, so the pairs are packed
+    into as many records as needed: c. counters, g. gauges, h. histograms
+    as count/mean/max:buckets.
+    """
+    line = "up=" + str(snapshot["up"])
+    for section in ("c", "g", "h"):
+        for name, value in snapshot[section].items():
+            if section == "h":
+                value = "%d/%d/%d:%s" % (value[0], value[1], value[2], ",".join(str(n) for n in value[3]))
+            pair = section + "." + name + "=" + str(value)
+            if len(line) + 1 + len(pair) > 120:
+                log.info("Metrics %s", line)
+                line = pair
+            else:
+                line += " " + pair
+    log.info("Metrics %s", line)
+
+def on_connect(link):
+    """mqtt_as connect_coro for a broker: (re)subscribe and ask for full reports.
+
+    Runs after every connect, since a clean session loses its subscriptions
+    when the connection drops. After a reconnect every printer is asked for
+    a pushall: a print may have paused, failed or finished during the
+    outage, and a printer that only sends deltas would not repeat it. Only
+    the first connect after boot skips printers whose restored snapshot is
+    recent enough (e.g. saved just before a soft reset).
+    """
+    booting = True
+
+    async def subscribe(client):
+        nonlocal booting
+        first, booting = booting, False
+        if log_request and link is status_link:
+            await client.subscribe(log_request, 0)
+        for printer in link.printers:
+            await client.subscribe(printer.topic, 0)
+            age = age_s(printer) if first else None
+            if age is None or age > pushall_after_s:
+                await client.publish(printer.request_topic, PUSHALL)
+            else:
+                log.info("State of %s is %d s old, skipping pushall", printer.serial, age)
+    return subscribe
+
+def make_links():
+    """One supervised MQTTClient per distinct broker, with the printers it carries.
+
+    Printers connected directly each get their own TLS session; printers
+    behind a shared local broker share one connection.
+    """
+    global status_link
+    groups = {}
+    for printer in printers:
+        key = printer.broker()
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(printer)
+    status_index = min(settings.get("metrics_link", 0), len(groups) - 1)
+    links = []
+    for group in groups.values():
+        link = supervisor.link(group)
+        if len(links) == status_index:
+            status_link = link
+        first = group[0]
+        cfg = dict(config)
+        cfg["server"] = first.server
+        cfg["port"] = first.port
+        cfg["ssl"] = context if first.tls else False
+        cfg["password"] = first.password
+        cfg["connect_coro"] = on_connect(link)
+        cfg["wifi_coro"] = link.on_wifi
+        cfg["backoff"] = link.backoff
+        # Wi-Fi is shared by every link: only the supervisor brings it up or resets it.
+        cfg["wifi_up"] = supervisor.wifi
+        if coalesce:
+            # A burst of reports (pushall after a reconnect, fast progress
+            # deltas) is parsed once per printer, newest first. Costs one
+            # buffer the size of the largest report per printer.
+            cfg["coalesce"] = len(group) + (1 if log_request and link is status_link else 0)
+        if links:
+            cfg["client_id"] = config["client_id"] + b'-' + str(len(links)).encode()
+        for printer in group:
+            printer.link = link
+        link.client = MQTTClient(cfg)
+        links.append(link)
+    metrics.gauge("reconnects", lambda: sum(link.client.reconnects for link in links))
+    metrics.gauge("outages", lambda: sum(link.outages for link in links))
+    metrics.gauge("links_down", supervisor.down)
+    metrics.gauge("wifi_resets", lambda: supervisor.wifi_resets)
+    metrics.gauge("tls_resumed", lambda: sum(link.client.tls_resumed for link in links))
+    if coalesce:
+        metrics.gauge("coalesced", lambda: sum(link.client.queue.coalesced for link in links))
+        metrics.gauge("queue_dropped", lambda: sum(link.client.queue.dropped for link in links))
+    for i, link in enumerate(links):
+        suffix = str(i) if len(links) > 1 else ""
+        metrics.add("outage_ms" + suffix, link.outage_ms)
+        metrics.add("recover_ms" + suffix, link.recover_ms)
 
 async def main():
-    client = MQTTClient(config)
-    try:
-        await client.connect()
-        print("Finished connecting to MQTT")
-    except Exception as e:
-        print(e)
-        for _ in range(5):
-            debug_led.toggle()
-            await asyncio.sleep(1.0)
-        machine.soft_reset()
-    await client.subscribe(topic, 0)
-    await client.publish(f'device/{serial}/request', '{"pushing":{"sequence_id": "0", "command": "pushall"}}')
+    # Status segments show Connecting until their printer's first report, so
+    # the strip is alive from the first frame while the network comes up.
     asyncio.create_task(update_pattern())
+    asyncio.create_task(state_store.run())
+    log_stage("render")
+    await supervisor.wifi()
+    log_stage("wifi")
+    make_links()
+    await supervisor.connect_all()
+    log_stage("mqtt")
+    if settings.get("ntp", True):
+        asyncio.create_task(sync_time())
     debug_led.on()
+    seconds = 0
     while True:
-        gc.collect()
-        global main_thread_rgb_lock
-        if not client.isconnected():
-            global main_thread_rgb_lock
-            main_thread_rgb_lock = True
-            debug_led.off()
-            for i in range(num_leds):
-                np[i] = (255, 0, 0)
-            np.write()
-        elif main_thread_rgb_lock:
-            global main_thread_rgb_lock
-            main_thread_rgb_lock = False
-            debug_led.on()
-        else:
-            global frame_count
-            print("Memory:", gc.mem_free(), "Frames:", frame_count)
-            print("Pattern:", type(current_pattern).__name__ if current_pattern else "None", "GCode:", gcode, "Progress:", progress, "Chamber Light:", printer_chamber_light_on, "Stage:", stage)
-            frame_count = 0
+        if gc.mem_free() < low_memory:
+            # Keep only what is on the strip; the rest is re-imported when needed.
+            keep = [seg.pattern for seg in segments]
+            for printer in printers:
+                keep.append(printer.pattern)
+                keep.append(printer.overlay)
+            if patterns.drop_unused(keep):
+                # Freed in the next frame's slack, or just below if the strip is idle.
+                pacer.request()
+        if not layout.animated:
+            # The render loop is idle and not asking the pacer.
+            pacer.idle()
+        # The debug LED is on while every broker connection is up.
+        debug_led.value(not supervisor.down())
+        seconds += 1
+        if metrics_interval and seconds >= metrics_interval:
+            seconds = 0
+            snapshot = metrics.snapshot()
+            scheduler.reset_stats()
+            if not metrics_topic:
+                # In the ring for log.dump() or log_topic; printed too with log_echo "info".
+                log_metrics(snapshot)
+            elif status_link.up:
+                # Not awaited: a publish waits out a dropped connection, this loop must not.
+                asyncio.create_task(status_link.client.publish(metrics_topic, json.dumps(snapshot)))
         await asyncio.sleep(1.0)
 
-# async def main():
-#     client = MQTTClient(server=mqtt_ip, client_id="printer-rgb", port=8883, user='emqx', password='public', ssl=context)
-#     client.set_callback(sub_cb)
-#     try:
-#         client.connect()
-#         print("Finished connecting to MQTT")
-#     except Exception as e:
-#         print(e)
-#         # machine.soft_reset()
-#     asyncio.create_task(update_pattern())
-#     client.subscribe(topic, 0)
-#     client.publish(f'device/{serial}/request', '{"pushing": {"sequence_id": "0","command": "pushall","version": 1,"push_target": 1}}')
-#     # await asyncio.sleep(1.0)
-
-#     while True:
-#         global frame_count
-#         print("Memory:", gc.mem_free(), "Frames:", frame_count)
-#         frame_count = 0
-#         client.check_msg()
-#         await asyncio.sleep(1.0)
-
 try:
     asyncio.run(main())
 except:
@@ -7,25 +7,20 @@
 # V5 support added by Bob Veringa.
 # Also other contributors.
 
-import gc
 import socket
 import struct
 import time
 
-gc.collect()
 from binascii import hexlify
 import asyncio
 
-gc.collect()
 from time import ticks_ms, ticks_diff
 from errno import EINPROGRESS, ETIMEDOUT
 
-gc.collect()
 from micropython import const
 from machine import unique_id
 import network
 
-gc.collect()
 from sys import platform
 
 VERSION = (0, 8, 4)
@@ -34,6 +29,7 @@ VERSION = (0, 8, 4)
 IBUFSIZE = 50
 # By default the callback interface returns and incoming message as bytes.
 # For performance reasons with large messages it may return a memoryview.
+# This is the default for config["msg_view"], which selects it per client.
 MSG_BYTES = True
 
 # Legitimate errors while waiting on a socket. See uasyncio __init__.py open_connection().
@@ -85,6 +81,64 @@ class MsgQueue:
         return r
 
 
+# Latest-value queue: keeps only the newest message per topic, for consumers
+# that track state rather than history. Memory is bounded to one payload
+# buffer per topic (at most `topics` of them); each buffer grows to the
+# largest payload seen on its topic and is then reused. With `views` the
+# consumer gets a memoryview into that buffer, valid until its next step.
+class LatestQueue:
+    def __init__(self, topics, views=False):
+        self._slots = {}  # topic: [buf, length, retained, props, pending]
+        self._ready = []  # Topics with an undelivered message, oldest first
+        self._topics = topics
+        self._views = views
+        self._evt = asyncio.Event()
+        self.coalesced = 0  # Messages replaced by a newer one before delivery
+        self.dropped = 0  # Messages discarded because the topic table was full
+
+    def put(self, topic, msg, retained, *props):
+        slot = self._slots.get(topic)
+        if slot is None:
+            if len(self._slots) >= self._topics:
+                self.dropped += 1
+                return
+            slot = [bytearray(len(msg)), 0, False, (), False]
+            self._slots[topic] = slot
+        n = len(msg)
+        if len(slot[0]) < n:
+            slot[0] = bytearray(n)
+        memoryview(slot[0])[:n] = msg
+        slot[1] = n
+        slot[2] = retained
+        slot[3] = props
+        if slot[4]:
+            self.coalesced += 1
+        else:
+            slot[4] = True
+            self._ready.append(topic)
+        self._evt.set()
+
+    def get(self):  # Oldest pending (topic, msg, retained[, props]) or None
+        if not self._ready:
+            return None
+        topic = self._ready.pop(0)
+        slot = self._slots[topic]
+        slot[4] = False
+        msg = memoryview(slot[0])[: slot[1]]
+        if not self._views:
+            msg = bytes(msg)
+        return (topic, msg, slot[2]) + slot[3]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._ready:
+            self._evt.clear()
+            await self._evt.wait()
+        return self.get()
+
+
 config = {
     "client_id": hexlify(unique_id()),
     "server": None,
@@ -106,6 +160,12 @@ config = {
     "ssid": None,
     "wifi_pw": None,
     "queue_len": 0,
+    "msg_view": not MSG_BYTES,
+    "coalesce": 0,  # >0: keep only the newest message per topic, for up to this many topics
+    "tls_resume": True,  # Offer the previous TLS session on reconnect, where ssl supports it
+    "log": None,  # Logger for dprint() messages: an object with debug(fmt, *args)
+    "backoff": None,  # Object whose next() gives the ms to wait after a failed reconnect, reset() on success
+    "wifi_up": None,  # Coroutine function that returns once Wi-Fi is up; the client then never touches the interface
     "gateway": False,
     "mqttv5": False,
     "mqttv5_con_props": None,
@@ -148,6 +208,13 @@ class MQTT_base:
 
     def __init__(self, config):
         self._events = config["queue_len"] > 0
+        # Zero-copy delivery: the callback gets a memoryview into ._ibuf. It is
+        # only valid until the callback returns; the next read overwrites it
+        # and the buffer may be reallocated. Callbacks must not retain it.
+        self._msg_view = config.get("msg_view", not MSG_BYTES) and not self._events
+        # Coalescing: messages go to a LatestQueue (which copies them) and are
+        # delivered from it outside the connection lock.
+        self._coalesce = config.get("coalesce", 0)
         # MQTT config
         self._client_id = config["client_id"]
         self._user = config["user"]
@@ -169,14 +236,33 @@ class MQTT_base:
         self._wifi_pw = config["wifi_pw"]
         self._ssl = config["ssl"]
         self._ssl_params = config["ssl_params"]
+        self._backoff = config.get("backoff")
+        # With several clients on one interface, bringing Wi-Fi up (or
+        # resetting it) is the application's job, not each client's.
+        self._wifi_up = config.get("wifi_up")
+        self._log = config.get("log")
+        self._tls_resume = config.get("tls_resume", True)
+        self._tls_session = None  # Session of the last TLS connection, for resumption
+        self.tls_resumed = 0  # Handshakes that resumed a session
+        # Duration in ms of each phase of the last (re)connect: Wi-Fi bring-up,
+        # TCP connect, TLS handshake, CONNECT to CONNACK, and for a reconnect
+        # the whole outage from losing the broker to CONNACK.
+        self.phase_ms = {"wifi": 0, "tcp": 0, "tls": 0, "mqtt": 0, "outage": 0}
         # Callbacks and coros
         if self._events:
             self.up = asyncio.Event()
             self.down = asyncio.Event()
-            self.queue = MsgQueue(config["queue_len"])
+            if self._coalesce:
+                self.queue = LatestQueue(self._coalesce, config.get("msg_view", not MSG_BYTES))
+            else:
+                self.queue = MsgQueue(config["queue_len"])
             self._cb = self.queue.put
         else:  # Callbacks
             self._cb = config["subs_cb"]
+            if self._coalesce:  # Callback runs from ._deliver()
+                self.queue = LatestQueue(self._coalesce, self._msg_view)
+                self._subs_cb = self._cb
+                self._cb = self.queue.put
             self._wifi_handler = config["wifi_coro"]
             self._connect_handler = config["connect_coro"]
         # Network
@@ -223,8 +309,12 @@ class MQTT_base:
         self._lw_qos = qos
         self._lw_retain = retain
 
+    # With config["log"] set, messages go to its debug() with the arguments
+    # unformatted, e.g. runtime/log.py, which formats them only when read.
     def dprint(self, msg, *args):
-        if self.DEBUG:
+        if self._log is not None:
+            self._log.debug(msg, *args)
+        elif self.DEBUG:
             print(msg % args)
 
     def _timeout(self, t):
@@ -237,6 +327,7 @@ class MQTT_base:
         oflow = n - len(self._ibuf)
         if oflow > 0:  # Grow the buffer and re-create the memoryview
             # Avoid too frequent small allocations by adding some extra bytes
+            self._mvbuf = None  # Drop the export first: CPython refuses to resize it
             self._ibuf.extend(bytearray(oflow + 50))
             self._mvbuf = memoryview(self._ibuf)
         buffer = self._mvbuf
@@ -299,16 +390,21 @@ class MQTT_base:
         self._sock.settimeout(10)
         self._sock.setblocking(False)
         self.dprint("Connecting to %s:%s", self.server, self.port)
+        t0 = ticks_ms()
         try:
             self._sock.connect(self._addr)
         except OSError as e:
             if e.args[0] not in BUSY_ERRORS:
                 raise
         await asyncio.sleep_ms(0)
+        t = ticks_ms()
+        self.phase_ms["tcp"] = ticks_diff(t, t0)
         self.dprint("Connecting to broker.")
         if self._ssl:
-            self._sock = self._ssl.wrap_socket(self._sock, server_hostname=self.server)
-        
+            self._sock = self._wrap(self._sock)
+        t0 = ticks_ms()
+        self.phase_ms["tls"] = ticks_diff(t0, t)
+
         premsg = bytearray(b"\x10\0\0\0\0\0")
         msg = bytearray(b"\x04MQTT\x00\0\0\0")
         msg[5] = 0x05 if mqttv5 else 0x04
@@ -375,6 +471,10 @@ class MQTT_base:
             raise OSError(-1, "CONNACK reason code 0x%x" % connack_resp[1])
 
         del connack_resp
+        self.phase_ms["mqtt"] = ticks_diff(ticks_ms(), t0)
+        if self._ssl and self._tls_resume:
+            # Ports whose SSLSocket has no session to export (MicroPython) keep None.
+            self._tls_session = getattr(self._sock, "session", None)
         if not mqttv5:
             # If we are not on MQTTv5 we can stop here
             return
@@ -386,6 +486,21 @@ class MQTT_base:
             self.dprint("CONNACK properties: %s", decoded_props)
             self.topic_alias_maximum = decoded_props.get(0x22, 0)
 
+    # Wrap a new socket in TLS, resuming the previous session when the ssl
+    # module can: a resumed handshake skips the certificate exchange and key
+    # agreement, the slowest part of a reconnect on a Pico.
+    def _wrap(self, sock):
+        if self._tls_session is not None:
+            try:
+                sock = self._ssl.wrap_socket(sock, server_hostname=self.server, session=self._tls_session)
+                if getattr(sock, "session_reused", False):
+                    self.tls_resumed += 1
+                return sock
+            except TypeError:  # wrap_socket() takes no session
+                self._tls_resume = False
+                self._tls_session = None
+        return self._ssl.wrap_socket(sock, server_hostname=self.server)
+
     async def _ping(self):
         async with self.lock:
             await self._as_write(b"\xc0\0")
@@ -450,6 +565,8 @@ class MQTT_base:
 
     def close(self):  # API. See https://github.com/peterhinch/micropython-mqtt/issues/60
         self._close()
+        if self._wifi_up is not None:
+            return  # The interface is not this client's to shut down
         try:
             self._sta_if.disconnect()  # Disconnect Wi-Fi to avoid errors
         except OSError:
@@ -532,17 +649,24 @@ class MQTT_base:
             sz += len(properties)
         offs = vbi(pkt, 1, sz)  # Store size as variable byte integer
         struct.pack_into("!H", pkt, offs, pid)
+        # Send the packet in one write: separate small writes each become a
+        # TLS record, and Nagle holds the later ones back until the broker
+        # ACKs the first (~40 ms after a reconnect, where it matters most).
+        if isinstance(topic, str):
+            topic = topic.encode()
+        pkt = pkt[: offs + 2]
+        if self.mqttv5:
+            pkt += properties
+        pkt += struct.pack("!H", len(topic))
+        pkt += topic
+        if sub:
+            # Only QoS is supported other features such as:
+            # (NL) No Local, (RAP) Retain As Published and Retain Handling.
+            # Are not supported.
+            pkt.append(qos)
 
         async with self.lock:
-            await self._as_write(pkt, offs + 2)
-            if self.mqttv5:
-                await self._as_write(properties)
-            await self._send_str(topic)
-            if sub:
-                # Only QoS is supported other features such as:
-                # (NL) No Local, (RAP) Retain As Published and Retain Handling.
-                # Are not supported.
-                await self._as_write(qos.to_bytes(1, "little"))
+            await self._as_write(pkt)
 
         if not await self._await_pid(pid):
             raise OSError(-1)
@@ -576,7 +700,7 @@ class MQTT_base:
 
         if res == b"\xd0":  # PINGRESP
             await self._as_read(1)  # Update .last_rx time
-            return
+            return True
         op = res[0]
 
         if op == 0x40:  # PUBACK
@@ -644,7 +768,7 @@ class MQTT_base:
                     raise OSError(-1, "DISCONNECT reason code 0x%x" % reason_code)
 
         if op & 0xF0 != 0x30:
-            return
+            return True
 
         sz, _ = await self._recv_len()
         topic_len = await self._as_read(2)
@@ -672,7 +796,7 @@ class MQTT_base:
         # every entry would contain the same message.
         # In callback mode not copying the message is OK so long as the callback is purely
         # synchronous. Overruns can't occur because of the lock.
-        if self._events or MSG_BYTES:
+        if not (self._msg_view or self._coalesce):
             msg = bytes(msg)
         retained = op & 0x01
         args = [topic, msg, bool(retained)]
@@ -686,6 +810,7 @@ class MQTT_base:
             await self._as_write(pkt)
         elif op & 6 == 4:  # qos 2 not supported
             raise OSError(-1, "QoS 2 not supported")
+        return True  # A packet was handled (None: nothing to read)
 
 
 # MQTTClient class. Handles issues relating to connectivity.
@@ -703,6 +828,10 @@ class MQTTClient(MQTT_base):
         self._in_connect = False
         self._has_connected = False  # Define 'Clean Session' value to use.
         self._tasks = []
+        self._lost = asyncio.Event()  # Set by ._reconnect() to wake ._keep_connected()
+        self._down_at = ticks_ms()  # When the broker connection was lost
+        self.reconnects = 0
+        self.failures = 0  # Failed reconnect attempts in a row
         if ESP8266:
             import esp
 
@@ -773,7 +902,17 @@ class MQTTClient(MQTT_base):
 
     async def connect(self, *, quick=False):  # Quick initial connect option for battery apps
         if not self._has_connected:
-            await self.wifi_connect(quick)  # On 1st call, caller handles error
+            # On 1st call, caller handles error. A quick connect over a link the
+            # application already brought up goes straight to the broker.
+            self.phase_ms["wifi"] = 0
+            if self._wifi_up is not None:
+                t = ticks_ms()
+                await self._wifi_up()
+                self.phase_ms["wifi"] = ticks_diff(ticks_ms(), t)
+            elif not (quick and self._sta_if.isconnected()):
+                t = ticks_ms()
+                await self.wifi_connect(quick)
+                self.phase_ms["wifi"] = ticks_diff(ticks_ms(), t)
             # Note this blocks if DNS lookup occurs. Do it once to prevent
             # blocking during later internet outage:
             self._addr = socket.getaddrinfo(self.server, self.port)[0][-1]
@@ -813,8 +952,6 @@ class MQTTClient(MQTT_base):
 
         asyncio.create_task(self._handle_msg())  # Task quits on connection fail.
         self._tasks.append(asyncio.create_task(self._keep_alive()))
-        if self.DEBUG:
-            self._tasks.append(asyncio.create_task(self._memory()))
         if self._events:
             self.up.set()  # Connectivity is up
         else:
@@ -824,9 +961,16 @@ class MQTTClient(MQTT_base):
     # handles incoming messages.
     async def _handle_msg(self):
         try:
+            # When coalescing, drain what has already arrived in one go so
+            # that only the newest message per topic gets delivered.
+            burst = 16 if self._coalesce else 1
             while self.isconnected():
                 async with self.lock:
-                    await self.wait_msg()  # Immediate return if no message
+                    n = burst
+                    while n and await self.wait_msg():  # Immediate return if no message
+                        n -= 1
+                if self._coalesce and not self._events:
+                    self._deliver()
                 # https://github.com/peterhinch/micropython-mqtt/issues/166
                 # A delay > 0 is necessary for webrepl compatibility.
                 await asyncio.sleep_ms(5)  # Let other tasks get lock
@@ -835,6 +979,12 @@ class MQTTClient(MQTT_base):
             pass
         self._reconnect()  # Broker or WiFi fail.
 
+    # Coalescing callback mode: after a burst has been read, run the user
+    # callback once per topic on its newest message, without holding the lock.
+    def _deliver(self):
+        while (args := self.queue.get()) is not None:
+            self._subs_cb(*args)
+
     # Keep broker alive MQTT spec 3.1.2.10 Keep Alive.
     # Runs until ping failure or no response in keepalive period.
     async def _keep_alive(self):
@@ -854,16 +1004,9 @@ class MQTTClient(MQTT_base):
         for task in self._tasks:
             task.cancel()
         self._tasks.clear()
-        await asyncio.sleep_ms(0)  # Ensure cancellation complete
-        if kill_skt:  # Close socket
+        if kill_skt:  # Close socket before yielding: a fast reconnect may replace it
             self._close()
-
-    # DEBUG: show RAM messages.
-    async def _memory(self):
-        while True:
-            await asyncio.sleep(20)
-            gc.collect()
-            self.dprint("RAM free %d alloc %d", gc.mem_free(), gc.mem_alloc())
+        await asyncio.sleep_ms(0)  # Ensure cancellation complete
 
     def isconnected(self):
         if self._in_connect:  # Disable low-level check during .connect()
@@ -876,7 +1019,9 @@ class MQTTClient(MQTT_base):
     def _reconnect(self):  # Schedule a reconnection if not underway.
         if self._isconnected:
             self._isconnected = False
+            self._down_at = ticks_ms()
             asyncio.create_task(self._kill_tasks(True))  # Shut down tasks and socket
+            self._lost.set()  # After the above: its first step closes the old socket
             if self._events:  # Signal an outage
                 self.down.set()
             else:
@@ -889,36 +1034,75 @@ class MQTTClient(MQTT_base):
 
     # Scheduled on 1st successful connection. Runs forever maintaining wifi and
     # broker connection. Must handle conditions at edge of WiFi range.
+    # If Wi-Fi is still up when the broker connection drops (broker restart,
+    # a lost TCP session) attempts go straight back to the broker over the
+    # existing link, with the cached address and TLS session. Every
+    # RESET_AFTER failed attempts in a row the link is reset and brought up
+    # again with the soak, in case it only looks up (edge of range). With
+    # config["wifi_up"] the client only awaits it and leaves the interface
+    # alone: other clients may be using it.
+    RESET_AFTER = 8
+
     async def _keep_connected(self):
         while self._has_connected:
-            if self.isconnected():  # Pause for 1 second
-                await asyncio.sleep(1)
-                gc.collect()
-            else:  # Link is down, socket is closed, tasks are killed
+            if self.isconnected():  # Pause for up to 1 second
+                self._lost.clear()
+                try:
+                    await asyncio.wait_for_ms(self._lost.wait(), 1000)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            # Link is down, socket is closed, tasks are killed
+            self.phase_ms["wifi"] = 0
+            if self._wifi_up is not None:
+                t = ticks_ms()
+                await self._wifi_up()
+                self.phase_ms["wifi"] = ticks_diff(ticks_ms(), t)
+            elif not self._sta_if.isconnected() or self.failures % self.RESET_AFTER == self.RESET_AFTER - 1:
                 try:
                     self._sta_if.disconnect()
                 except OSError:
                     self.dprint("Wi-Fi not started, unable to disconnect interface")
                 await asyncio.sleep(1)
+                t = ticks_ms()
                 try:
                     await self.wifi_connect()
                 except OSError:
+                    await self._pause()
                     continue
-                if not self._has_connected:  # User has issued the terminal .disconnect()
-                    self.dprint("Disconnected, exiting _keep_connected")
-                    break
-                try:
-                    await self.connect()
-                    # Now has set ._isconnected and scheduled _connect_handler().
-                    self.dprint("Reconnect OK!")
-                except OSError as e:
-                    self.dprint("Error in reconnect. %s", e)
-                    # Can get ECONNABORTED or -1. The latter signifies no or bad CONNACK received.
-                    self._close()  # Disconnect and try again.
-                    self._in_connect = False
-                    self._isconnected = False
+                self.phase_ms["wifi"] = ticks_diff(ticks_ms(), t)
+            if not self._has_connected:  # User has issued the terminal .disconnect()
+                self.dprint("Disconnected, exiting _keep_connected")
+                break
+            try:
+                await self.connect()
+                # Now has set ._isconnected and scheduled _connect_handler().
+                self.reconnects += 1
+                self.failures = 0
+                self.phase_ms["outage"] = ticks_diff(ticks_ms(), self._down_at)
+                self.dprint("Reconnect OK! %s", self.phase_ms)
+                if self._backoff is not None:
+                    self._backoff.reset()
+            except OSError as e:
+                self.dprint("Error in reconnect. %s", e)
+                # Can get ECONNABORTED or -1. The latter signifies no or bad CONNACK received.
+                self._close()  # Disconnect and try again.
+                self._in_connect = False
+                self._isconnected = False
+                self.failures += 1
+                await self._pause()
         self.dprint("Disconnected, exited _keep_connected")
 
+    # Wait before retrying a failed reconnect: as long as the application's
+    # backoff says, or a fixed second without one (as before backoff existed).
+    async def _pause(self):
+        if self._backoff is None:
+            await asyncio.sleep(1)
+            return
+        delay = self._backoff.next()
+        self.dprint("Retrying in %d ms", delay)
+        await asyncio.sleep_ms(delay)
+
     async def subscribe(self, topic, qos=0, properties=None):
         qos_check(qos)
         while 1:
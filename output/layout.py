@@ -0,0 +1,146 @@
+"""Map logical LED segments onto one or more physical strips.
+
+An enclosure can have several strips (a top bar, side accents, a single
+status pixel) on different pins. settings.json describes them as
+`outputs` and `segments`:
+
+    "outputs": [{"pin": 0, "num_leds": 60}, {"pin": 1, "num_leds": 24}],
+    "segments": [
+        {"name": "bar", "ranges": [[0, 0, 60]]},
+        {"name": "sides", "printer": 1, "ranges": [[1, 0, 12], [1, 12, 11, true]]},
+        {"name": "dot", "pattern": "idle", "ranges": [[1, 23, 1]]}
+    ]
+
+Each range is [output, first pixel, count] with an optional reverse flag.
+A segment's `pattern` is "status" (follow the state of printer number
+`printer`, default 0) or the name of a fixed pattern. Without these keys the layout is one
+strip of `num_leds` on `led_pin` showing the status.
+
+All segments render into one framebuffer in logical order. The copies
+from there to the strip buffers are worked out once, so a frame costs one
+slice copy per forward range. A segment is only rendered when its pattern
+is animated or it was marked dirty, and a strip is only copied, corrected
+and written when one of its segments was rendered.
+"""
+
+from output.writer import FrameWriter
+
+
+class Segment:
+    def __init__(self, name, ranges, pattern='status', printer=0):
+        self.name = name
+        self.ranges = ranges  # (output, first, count, reverse)
+        self.pattern = pattern
+        self.printer = printer
+        self.progress = 0.0  # Passed to the source's update()
+        self.num_leds = 0
+        for r in ranges:
+            self.num_leds += r[2]
+        self.source = None  # Pattern drawn into this segment, set by the caller
+        self.view = None  # Slice of the layout framebuffer
+        self.mask = 0  # Bit k set if the segment feeds output k
+        self.dirty = True
+
+
+def parse_layout(settings):
+    """Return ([(pin, num_leds)], [Segment]) from settings.json.
+
+    Raises ValueError for ranges that fall outside their output or overlap.
+    """
+    outputs = settings.get("outputs")
+    if outputs:
+        outputs = [(o.get("pin", 0), o["num_leds"]) for o in outputs]
+    else:
+        outputs = [(settings.get("led_pin", 0), settings.get("num_leds", 64))]
+    specs = settings.get("segments")
+    if not specs:
+        specs = [{"name": "main", "ranges": [[0, 0, outputs[0][1]]]}]
+
+    used = [bytearray(n) for _, n in outputs]
+    segments = []
+    for spec in specs:
+        ranges = []
+        for r in spec["ranges"]:
+            out, first, count = r[0], r[1], r[2]
+            if out >= len(outputs) or first < 0 or count <= 0 or first + count > outputs[out][1]:
+                raise ValueError("Segment range out of bounds: " + str(r))
+            for i in range(first, first + count):
+                if used[out][i]:
+                    raise ValueError("Segment ranges overlap: " + str(r))
+                used[out][i] = 1
+            ranges.append((out, first, count, len(r) > 3 and bool(r[3])))
+        segments.append(Segment(spec.get("name", str(len(segments))), ranges,
+                                spec.get("pattern", "status"), spec.get("printer", 0)))
+    return outputs, segments
+
+
+class Layout:
+    def __init__(self, strips, segments, bpp=3):
+        self.strips = strips
+        self.writers = [FrameWriter(np) for np in strips]
+        self.segments = segments
+        self.bpp = bpp
+        self.num_leds = 0
+        for seg in segments:
+            self.num_leds += seg.num_leds
+        self.frame = bytearray(self.num_leds * bpp)
+        frame = memoryview(self.frame)
+
+        # Per output, a list of (dst, src, reverse) views: forward ranges are
+        # one slice copy, reversed ones are copied pixel by pixel.
+        self._plan = [[] for _ in strips]
+        offset = 0
+        for seg in segments:
+            size = seg.num_leds * bpp
+            seg.view = frame[offset:offset + size]
+            for out, first, count, reverse in seg.ranges:
+                dst = memoryview(strips[out].buf)[first * bpp:(first + count) * bpp]
+                self._plan[out].append((dst, frame[offset:offset + count * bpp], reverse))
+                seg.mask |= 1 << out
+                offset += count * bpp
+
+    @property
+    def animated(self):
+        for seg in self.segments:
+            if seg.source is not None and seg.source.animated:
+                return True
+        return False
+
+    def render(self, now, order):
+        """Render segments that changed into the framebuffer.
+
+        Returns a bitmask of the outputs that need flushing.
+        """
+        touched = 0
+        for seg in self.segments:
+            src = seg.source
+            if src is None or not (seg.dirty or src.animated):
+                continue
+            src.update(now, seg.progress)
+            src.render_into(seg.view, seg.num_leds, order)
+            seg.dirty = False
+            touched |= seg.mask
+        return touched
+
+    def flush(self, touched, pipeline):
+        """Copy, color-correct and write each output in `touched` once.
+
+        Returns the number of strips actually written.
+        """
+        written = 0
+        bpp = self.bpp
+        for k in range(len(self.strips)):
+            if not touched & (1 << k):
+                continue
+            for dst, src, reverse in self._plan[k]:
+                if not reverse:
+                    dst[:] = src
+                    continue
+                n = len(src)
+                for i in range(0, n, bpp):
+                    dst[n - bpp - i:n - i] = src[i:i + bpp]
+            np = self.strips[k]
+            pipeline.apply(np.buf, np.n)
+            if self.writers[k].commit():
+                written += 1
+        return written
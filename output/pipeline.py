@@ -0,0 +1,158 @@
+"""Final color stage between pattern rendering and the strip.
+
+Patterns render full-range colors straight into the strip buffer in its
+byte order. ColorPipeline then corrects the whole frame in one pass using
+precomputed 256-entry tables that fold together global brightness,
+per-channel white balance and gamma. On RGBW strips it also moves the
+common white part of each pixel onto the W channel (unless extract_white
+is off). With every table the identity and no white extraction the pass
+is skipped entirely. On the board the per-pixel loops are compiled with
+the viper emitter.
+"""
+
+import sys
+
+_VIPER = sys.implementation.name == 'micropython'
+if _VIPER:
+    import micropython
+
+CHANNELS = 'RGBW'
+
+
+def parse_order(name):
+    """Turn a color order name such as 'GRB' or 'RGBW' into byte offsets per channel.
+
+    The result is indexed by channel (R, G, B[, W]) like NeoPixel.ORDER:
+    'GRB' -> (1, 0, 2).
+    """
+    name = name.upper()
+    if sorted(name) not in (sorted('RGB'), sorted('RGBW')):
+        raise ValueError("Invalid color order: " + name)
+    return tuple(name.index(c) for c in CHANNELS[:len(name)])
+
+
+def make_lut(brightness=1.0, balance=1.0, gamma=1.0):
+    lut = bytearray(256)
+    scale = 255 * brightness * balance
+    for v in range(256):
+        lut[v] = max(0, min(255, int(round(scale * (v / 255) ** gamma))))
+    return lut
+
+
+# Viper functions take at most four arguments: the tables go in as one
+# bytearray (256 entries per byte position) and the RGBW byte offsets and
+# the white extraction flag packed into one int (see ColorPipeline._spec).
+if _VIPER:
+    @micropython.viper
+    def _apply3(buf, n: int, table):
+        p = ptr8(buf)  # noqa: F821 (viper builtins)
+        t = ptr8(table)  # noqa: F821
+        for i in range(0, n, 3):
+            p[i] = t[p[i]]
+            p[i + 1] = t[256 + p[i + 1]]
+            p[i + 2] = t[512 + p[i + 2]]
+
+    @micropython.viper
+    def _apply4(buf, n: int, table, spec: int):
+        p = ptr8(buf)  # noqa: F821
+        t = ptr8(table)  # noqa: F821
+        r = spec & 3
+        g = (spec >> 2) & 3
+        b = (spec >> 4) & 3
+        w = (spec >> 6) & 3
+        extract = spec & 256
+        for i in range(0, n, 4):
+            vr = p[i + r]
+            vg = p[i + g]
+            vb = p[i + b]
+            if extract:
+                white = vr
+                if vg < white:
+                    white = vg
+                if vb < white:
+                    white = vb
+                vr -= white
+                vg -= white
+                vb -= white
+            else:
+                white = p[i + w]
+            p[i + r] = t[(r << 8) + vr]
+            p[i + g] = t[(g << 8) + vg]
+            p[i + b] = t[(b << 8) + vb]
+            p[i + w] = t[(w << 8) + white]
+else:
+    def _apply3(buf, n, table):
+        l0 = memoryview(table)[:256]
+        l1 = memoryview(table)[256:512]
+        l2 = memoryview(table)[512:768]
+        for i in range(0, n, 3):
+            buf[i] = l0[buf[i]]
+            buf[i + 1] = l1[buf[i + 1]]
+            buf[i + 2] = l2[buf[i + 2]]
+
+    def _apply4(buf, n, table, spec):
+        r = spec & 3
+        g = (spec >> 2) & 3
+        b = (spec >> 4) & 3
+        w = (spec >> 6) & 3
+        lr = memoryview(table)[r << 8:(r + 1) << 8]
+        lg = memoryview(table)[g << 8:(g + 1) << 8]
+        lb = memoryview(table)[b << 8:(b + 1) << 8]
+        lw = memoryview(table)[w << 8:(w + 1) << 8]
+        if not spec & 256:
+            for i in range(0, n, 4):
+                buf[i + r] = lr[buf[i + r]]
+                buf[i + g] = lg[buf[i + g]]
+                buf[i + b] = lb[buf[i + b]]
+                buf[i + w] = lw[buf[i + w]]
+            return
+        # Extract the white shared by R, G and B onto the W channel.
+        for i in range(0, n, 4):
+            vr = buf[i + r]
+            vg = buf[i + g]
+            vb = buf[i + b]
+            white = vr if vr < vg else vg
+            if vb < white:
+                white = vb
+            buf[i + r] = lr[vr - white]
+            buf[i + g] = lg[vg - white]
+            buf[i + b] = lb[vb - white]
+            buf[i + w] = lw[white]
+
+
+class ColorPipeline:
+    def __init__(self, order='GRB', brightness=1.0, gamma=1.0, white_balance=(1.0, 1.0, 1.0, 1.0),
+                 extract_white=True):
+        self.order = parse_order(order)
+        self.bpp = len(self.order)
+        self.extract_white = self.bpp == 4 and extract_white
+        if self.bpp == 4:
+            r, g, b, w = self.order
+            self._spec = r | g << 2 | b << 4 | w << 6 | (256 if self.extract_white else 0)
+        self.gamma = float(gamma) if gamma > 0 else 1.0
+        self.white_balance = tuple(white_balance) + (1.0,) * (4 - len(white_balance))
+        self.set_brightness(brightness)
+
+    def set_brightness(self, brightness):
+        """Rebuild the tables for a new global brightness in [0, 1]."""
+        self.brightness = max(0.0, min(1.0, float(brightness)))
+        # One table per byte position within a pixel, so apply() can walk the
+        # buffer without looking up which channel each byte belongs to.
+        table = bytearray(256 * self.bpp)
+        for c in range(self.bpp):
+            pos = self.order[c] << 8
+            table[pos:pos + 256] = make_lut(self.brightness, self.white_balance[c], self.gamma)
+        self._table = table
+        neutral = (1.0,) * self.bpp
+        self.identity = (not self.extract_white and self.brightness == 1.0 and self.gamma == 1.0
+                         and self.white_balance[:self.bpp] == neutral)
+
+    def apply(self, buf, num_leds):
+        """Correct `num_leds` pixels of `buf` in place."""
+        if self.identity:
+            return
+        n = num_leds * self.bpp
+        if self.bpp == 3:
+            _apply3(buf, n, self._table)
+        else:
+            _apply4(buf, n, self._table, self._spec)
@@ -0,0 +1,57 @@
+"""Deadline-based frame pacing for the render loop.
+
+Instead of sleeping a fixed delay after each frame (which lets the frame
+rate drift with render cost and MQTT activity), FrameScheduler sleeps
+until the next frame deadline at the target FPS. If a frame overruns one
+or more deadlines those frames are dropped rather than rendered late, so
+lag never accumulates. Render time, write time and wake-up lateness are
+recorded into histograms.
+"""
+
+import asyncio
+from time import ticks_us, ticks_diff, ticks_add
+
+from runtime.metrics import Histogram
+
+
+class FrameScheduler:
+    def __init__(self, fps=100):
+        self.fps = fps if fps > 0 else 100
+        self.period_us = 1000000 // self.fps
+        self.render = Histogram()
+        self.write = Histogram()
+        self.lateness = Histogram()
+        self.dropped = 0
+        self._deadline = None
+
+    async def wait(self):
+        """Sleep until the next frame deadline and record how late we woke."""
+        now = ticks_us()
+        if self._deadline is None:
+            self._deadline = now
+        period = self.period_us
+        self._deadline = ticks_add(self._deadline, period)
+        late = ticks_diff(now, self._deadline)
+        if late > 0:
+            # Already past the deadline: skip the frames we cannot make.
+            missed = late // period + 1
+            self.dropped += missed
+            self._deadline = ticks_add(self._deadline, missed * period)
+        await asyncio.sleep_ms(ticks_diff(self._deadline, now) // 1000)
+        self.lateness.record(max(0, ticks_diff(ticks_us(), self._deadline)))
+
+    def slack_us(self):
+        """Time left until the next frame deadline."""
+        if self._deadline is None:
+            return self.period_us
+        return ticks_diff(ticks_add(self._deadline, self.period_us), ticks_us())
+
+    def resync(self):
+        """Restart pacing from now, e.g. after the render loop was blocked."""
+        self._deadline = None
+
+    def reset_stats(self):
+        self.render.reset()
+        self.write.reset()
+        self.lateness.reset()
+        self.dropped = 0
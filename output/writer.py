@@ -0,0 +1,33 @@
+"""Push frames to the strip only when they differ from the last one written.
+
+Each WS2812 write blocks for roughly 30 us per LED, so re-sending an
+unchanged frame (a paused bar, a finished print, a dark strip) costs real
+render and network time. FrameWriter keeps a copy of the last frame sent
+and compares the freshly rendered buffer against it before writing.
+"""
+
+
+class FrameWriter:
+    def __init__(self, np):
+        self.np = np
+        self._prev = bytearray(len(np.buf))
+        self._valid = False  # False until a frame has been written
+        self.rendered = 0
+        self.written = 0
+        self.skipped = 0
+
+    def commit(self):
+        """Write np.buf to the strip unless it matches the last written frame.
+
+        Returns True if the strip was written.
+        """
+        self.rendered += 1
+        buf = self.np.buf
+        if self._valid and buf == self._prev:
+            self.skipped += 1
+            return False
+        self._prev[:] = buf
+        self._valid = True
+        self.np.write()
+        self.written += 1
+        return True
@@ -0,0 +1,84 @@
+"""Pre-rendered playback for strictly periodic patterns.
+
+A pattern opts in by returning a hashable key from bake_key(). The first
+time it is drawn, one full period is rendered at the target frame rate
+into a single bytearray; later frames are copied out by phase index with
+no math. Baked patterns are kept under a byte budget and the least
+recently used one is evicted when a new bake does not fit. Patterns with
+no bake key (e.g. Progress) are always rendered live.
+"""
+
+from patterns.pattern import GRB, fill
+
+
+class BakeCache:
+    def __init__(self, budget=16384, fps=100):
+        self.budget = int(budget)
+        self.fps = int(fps) if fps > 0 else 100
+        self.used = 0
+        self.bakes = 0
+        self.evictions = 0
+        self._entries = {}  # key -> [data, frames, frame_size, uniform, last_use]
+        self._tick = 0
+
+    def render_into(self, pattern, buf, num_leds, order=GRB):
+        """Draw the current frame of `pattern` into `buf`, baking it on first use."""
+        key = pattern.bake_key()
+        if key is None:
+            pattern.render_into(buf, num_leds, order)
+            return
+        uniform = pattern.all_same
+        key = (key, 1 if uniform else num_leds, order, self.fps)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._bake(pattern, key, num_leds, order, uniform)
+            if entry is None:  # Too big for the budget
+                pattern.render_into(buf, num_leds, order)
+                return
+        self._tick += 1
+        entry[4] = self._tick
+        data, frames, frame_size = entry[0], entry[1], entry[2]
+        index = int((pattern.last_frame % pattern.period) * self.fps) % frames
+        offset = index * frame_size
+        mv = memoryview(data)
+        if entry[3]:
+            fill(buf, 0, num_leds, mv[offset:offset + frame_size])
+        else:
+            memoryview(buf)[0:frame_size] = mv[offset:offset + frame_size]
+
+    def _bake(self, pattern, key, num_leds, order, uniform):
+        frames = max(1, int(round(pattern.period * self.fps)))
+        pixels = 1 if uniform else num_leds
+        frame_size = pixels * len(order)
+        size = frames * frame_size
+        if size > self.budget:
+            return None
+        while self.used + size > self.budget:
+            self._evict()
+
+        data = bytearray(size)
+        mv = memoryview(data)
+        last_frame, progress = pattern.last_frame, pattern.progress
+        for i in range(frames):
+            pattern.update(i / self.fps, progress)
+            offset = i * frame_size
+            pattern.render_into(mv[offset:offset + frame_size], pixels, order)
+        pattern.update(last_frame, progress)
+
+        entry = [data, frames, frame_size, uniform, self._tick]
+        self._entries[key] = entry
+        self.used += size
+        self.bakes += 1
+        return entry
+
+    def _evict(self):
+        oldest = None
+        for key, entry in self._entries.items():
+            if oldest is None or entry[4] < self._entries[oldest][4]:
+                oldest = key
+        self.used -= len(self._entries.pop(oldest)[0])
+        self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.used = 0
@@ -5,7 +5,7 @@ gain a time-based sinusoidal breathing envelope with optional gamma
 correction.
 """
 
-from patterns.pattern import Pattern
+from patterns.pattern import Pattern, GRB, pack, fill
 import math
 
 
@@ -42,11 +42,23 @@ class Breathe(Pattern):
         t = getattr(self, 'last_frame', 0.0)
         return compute_brightness_from_time(t, period=self.period, gamma=self.gamma)
 
+    def bake_key(self):
+        return ('breathe', self.base_color, self.period, self.gamma)
+
+    def color(self):
+        """Return the RGB tuple for the current frame, computed once per frame."""
+        if getattr(self, '_cached_frame', None) != self.last_frame:
+            b = self.brightness()
+            r = int(max(0, min(255, round(self.base_color[0] * b))))
+            g = int(max(0, min(255, round(self.base_color[1] * b))))
+            bl = int(max(0, min(255, round(self.base_color[2] * b))))
+            self._cached_color = (r, g, bl)
+            self._cached_frame = self.last_frame
+        return self._cached_color
+
     def at(self, pos):
         """Return an RGB tuple for position `pos` using base_color scaled by brightness."""
-        b = self.brightness()
-        r = int(max(0, min(255, round(self.base_color[0] * b))))
-        g = int(max(0, min(255, round(self.base_color[1] * b))))
-        bl = int(max(0, min(255, round(self.base_color[2] * b))))
+        return self.color()
 
-        return (r, g, bl)
+    def render_into(self, buf, num_leds, order=GRB):
+        fill(buf, 0, num_leds, pack(self.color(), order))
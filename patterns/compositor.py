@@ -0,0 +1,181 @@
+"""Layer several patterns into one frame and crossfade between states.
+
+A Compositor is itself a Pattern, so the render loop drives it like any
+other. It holds a stack of layers: a base pattern plus optional overlays,
+each with a blend mode (alpha, add or max) and a strength. Every layer
+is rendered into a preallocated scratch buffer and blended into the frame
+in a single pass. transition() swaps in a new stack and, for `fade_ms`,
+mixes the outgoing and incoming stacks so state changes crossfade instead
+of cutting. Blending works on raw strip bytes, so it is independent of
+channel order, and the per-frame path allocates nothing. A layer or fade
+step at full strength is a plain copy and one at zero is skipped.
+"""
+
+import sys
+
+from patterns.pattern import Pattern, GRB, fill
+
+# On the board the blend loops are compiled with the viper emitter; a
+# desktop Python runs the plain versions.
+_VIPER = sys.implementation.name == 'micropython'
+if _VIPER:
+    import micropython
+
+BLEND_ALPHA = 0
+BLEND_ADD = 1
+BLEND_MAX = 2
+
+
+if _VIPER:
+    @micropython.viper
+    def _copy(dst, src, n: int):
+        d = ptr8(dst)  # noqa: F821 (viper builtins)
+        s = ptr8(src)  # noqa: F821
+        for i in range(n):
+            d[i] = s[i]
+
+    @micropython.viper
+    def _alpha(dst, src, n: int, alpha: int):
+        d = ptr8(dst)  # noqa: F821
+        s = ptr8(src)  # noqa: F821
+        inv = 256 - alpha
+        for i in range(n):
+            d[i] = (d[i] * inv + s[i] * alpha) >> 8
+
+    @micropython.viper
+    def _add(dst, src, n: int, alpha: int):
+        d = ptr8(dst)  # noqa: F821
+        s = ptr8(src)  # noqa: F821
+        for i in range(n):
+            v = d[i] + ((s[i] * alpha) >> 8)
+            d[i] = v if v < 255 else 255
+
+    @micropython.viper
+    def _max(dst, src, n: int, alpha: int):
+        d = ptr8(dst)  # noqa: F821
+        s = ptr8(src)  # noqa: F821
+        for i in range(n):
+            v = (s[i] * alpha) >> 8
+            if v > d[i]:
+                d[i] = v
+else:
+    def _copy(dst, src, n):
+        memoryview(dst)[:n] = memoryview(src)[:n]
+
+    def _alpha(dst, src, n, alpha):
+        inv = 256 - alpha
+        for i in range(n):
+            dst[i] = (dst[i] * inv + src[i] * alpha) >> 8
+
+    def _add(dst, src, n, alpha):
+        for i in range(n):
+            v = dst[i] + ((src[i] * alpha) >> 8)
+            dst[i] = v if v < 255 else 255
+
+    def _max(dst, src, n, alpha):
+        for i in range(n):
+            v = (src[i] * alpha) >> 8
+            if v > dst[i]:
+                dst[i] = v
+
+
+def blend(dst, src, n, mode=BLEND_ALPHA, alpha=256):
+    """Blend the first `n` bytes of `src` into `dst`. `alpha` is 0..256."""
+    if alpha <= 0:
+        return  # Nothing of src shows
+    if mode == BLEND_ALPHA:
+        if alpha >= 256:
+            _copy(dst, src, n)
+        else:
+            _alpha(dst, src, n, alpha)
+    elif mode == BLEND_ADD:
+        _add(dst, src, n, alpha)
+    else:
+        _max(dst, src, n, alpha)
+
+
+class Compositor(Pattern):
+    def __init__(self, num_leds, bpp=3, cache=None, fade_ms=400):
+        super().__init__()
+        self.num_leds = num_leds
+        self.cache = cache  # Optional BakeCache used to render each layer
+        self.fade = fade_ms / 1000
+        self.layers = []  # [pattern, mode, alpha] with the base first
+        self._old = []
+        self._fade_start = None
+        self._fading = False
+        size = num_leds * bpp
+        self._scratch = bytearray(size)
+        self._from = bytearray(size)
+        self._black = bytearray(bpp)
+        self.all_same = False
+        self.animated = False
+
+    def transition(self, base, overlays=(), fade=True):
+        """Replace the layer stack with `base` plus (pattern, mode, alpha) overlays.
+
+        `base` may be None for a dark strip. With `fade` the old stack is
+        crossfaded out over fade_ms, starting at the next update().
+        """
+        layers = []
+        if base is not None:
+            layers.append([base, BLEND_ALPHA, 256])
+        for pattern, mode, alpha in overlays:
+            layers.append([pattern, mode, alpha])
+        for layer in layers:
+            layer[0].num_leds = self.num_leds
+        fade = fade and self.fade > 0 and bool(self.layers or layers)
+        self._old = self.layers if fade else []
+        self.layers = layers
+        self._fading = fade
+        self._fade_start = None
+        self.animated = self._fading or self._any_animated()
+
+    def _any_animated(self):
+        for layer in self.layers:
+            if layer[0].animated:
+                return True
+        return False
+
+    def update(self, current_frame, progress=0.0):
+        super().update(current_frame, progress)
+        if self._fading and self._fade_start is None:
+            self._fade_start = self.last_frame
+        for layer in self.layers:
+            layer[0].update(current_frame, progress)
+        for layer in self._old:
+            layer[0].update(current_frame, progress)
+
+    def _render_layer(self, pattern, buf, num_leds, order):
+        if self.cache is not None:
+            self.cache.render_into(pattern, buf, num_leds, order)
+        else:
+            pattern.render_into(buf, num_leds, order)
+
+    def _compose(self, layers, dst, num_leds, order):
+        n = num_leds * len(order)
+        if not layers:
+            fill(dst, 0, num_leds, self._black)
+            return
+        self._render_layer(layers[0][0], dst, num_leds, order)
+        for i in range(1, len(layers)):
+            pattern, mode, alpha = layers[i]
+            self._render_layer(pattern, self._scratch, num_leds, order)
+            blend(dst, self._scratch, n, mode, alpha)
+
+    def render_into(self, buf, num_leds, order=GRB):
+        if not self._fading:
+            self._compose(self.layers, buf, num_leds, order)
+            return
+        start = self._fade_start
+        elapsed = 0.0 if start is None else self.last_frame - start
+        if elapsed >= self.fade:
+            self._fading = False
+            self._old = []
+            self.animated = self._any_animated()
+            self._compose(self.layers, buf, num_leds, order)
+            return
+        self._compose(self._old, self._from, num_leds, order)
+        self._compose(self.layers, buf, num_leds, order)
+        # buf holds the incoming stack; pull it towards the outgoing one.
+        blend(buf, self._from, num_leds * len(order), BLEND_ALPHA, 256 - int(256 * elapsed / self.fade))
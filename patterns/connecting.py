@@ -0,0 +1,49 @@
+from patterns.pattern import Pattern, GRB, pack, fill
+
+
+class Connecting(Pattern):
+    def __init__(self, period=1.5, color=(0, 200, 200), tail=5):
+        # A cyan comet running along the strip while the board is still
+        # bringing up Wi-Fi and MQTT; unlike Idle's blue breathe it cannot
+        # be mistaken for a healthy, idle printer.
+        super().__init__()
+        self.period = float(period) if period > 0 else 1.5
+        self.color = tuple(int(c) for c in color)
+        self.tail = max(1, int(tail))
+        self.all_same = False
+        self._order = None
+        self._pixels = None  # Packed head and tail pixels, brightest first
+        self._dark = None
+
+    def bake_key(self):
+        return ('connecting', self.period, self.color, self.tail)
+
+    def head(self, num_leds):
+        phase = (self.last_frame % self.period) / self.period
+        return int(phase * num_leds) % num_leds if num_leds else 0
+
+    def at(self, pos):
+        k = (self.head(self.num_leds or 1) - pos) % (self.num_leds or 1)
+        if k >= self.tail:
+            return (0, 0, 0)
+        scale = (self.tail - k) / self.tail
+        return tuple(int(c * scale) for c in self.color)
+
+    def render_into(self, buf, num_leds, order=GRB):
+        if order != self._order:
+            pixels = []
+            for k in range(self.tail):
+                scale = (self.tail - k) / self.tail
+                pixels.append(pack(tuple(int(c * scale) for c in self.color), order))
+            self._pixels = pixels
+            self._dark = bytearray(len(order))
+            self._order = order
+        fill(buf, 0, num_leds, self._dark)
+        if num_leds <= 0:
+            return
+        head = self.head(num_leds)
+        bpp = len(order)
+        mv = memoryview(buf)
+        for k in range(min(self.tail, num_leds)):
+            offset = ((head - k) % num_leds) * bpp
+            mv[offset:offset + bpp] = self._pixels[k]
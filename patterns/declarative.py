@@ -0,0 +1,174 @@
+"""Patterns described in settings.json instead of code.
+
+    "patterns": {
+        "error": {"type": "breathe", "color": [255, 0, 0], "period": 2.0, "gamma": 2.2},
+        "progress": {"type": "bar", "color": [0, 255, 0], "background": [255, 255, 255]},
+        "idle": {"type": "chase", "color": [0, 0, 255], "length": 8, "period": 3.0,
+                 "direction": "reverse"},
+        "standby": {"type": "solid", "color": [16, 16, 16]}
+    }
+
+Types are solid, breathe, bar (print progress) and chase (a block with a
+fading tail running around the strip). All take `color` and `background`
+(default white on black); breathe and chase take `period` (seconds) and
+`gamma`; bar and chase take `direction` ("forward" or "reverse"); chase
+takes `length`. main.py registers every entry with the PatternRegistry,
+replacing a built-in pattern of the same name.
+
+compile_pattern() validates a spec once and returns a factory. Each
+instance then compiles a render function the first time it sees a strip
+byte order, with every pixel it can show already packed in that order:
+one period of breathe levels, the chase tail, the bar's edge pixel at 64
+fill levels. A frame only computes an index and copies packed pixels.
+"""
+
+import math
+
+from patterns.pattern import Pattern, GRB, RGB, pack, fill
+
+TYPES = ('solid', 'breathe', 'bar', 'chase')
+EDGE_LEVELS = 64  # Fill levels of the bar's partially lit pixel
+
+
+def _color(value, default):
+    if value is None:
+        return default
+    if len(value) < 3:
+        raise ValueError("Color needs three channels: " + str(value))
+    return tuple(max(0, min(255, int(c))) for c in value)
+
+
+def _mix(background, color, level):
+    return tuple(int(round(background[c] + (color[c] - background[c]) * level)) for c in range(len(color)))
+
+
+def _shape(raw, gamma):
+    # Same curve as Breathe: raw ** (1 / gamma)
+    return math.pow(raw, 1.0 / gamma) if gamma != 1.0 else raw
+
+
+def compile_pattern(name, spec):
+    """Check a pattern spec from settings.json and return a factory for it.
+
+    Raises ValueError for unknown types or bad parameters.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Pattern " + name + " must be an object")
+    kind = spec.get('type')
+    if kind not in TYPES:
+        raise ValueError("Unknown type for pattern " + name + ": " + str(kind))
+    period = float(spec.get('period', 2.0))
+    gamma = float(spec.get('gamma', 1.0))
+    length = int(spec.get('length', 5))
+    direction = spec.get('direction', 'forward')
+    if period <= 0 or gamma <= 0 or length < 1 or direction not in ('forward', 'reverse'):
+        raise ValueError("Bad parameters for pattern " + name)
+    config = (kind, _color(spec.get('color'), (255, 255, 255)), _color(spec.get('background'), (0, 0, 0)),
+              period, gamma, length, direction == 'reverse')
+    return lambda: Declarative(name, config)
+
+
+class Declarative(Pattern):
+    def __init__(self, name, config):
+        super().__init__()
+        self.name = name
+        self.kind, self.color, self.background, self.period, self.gamma, self.length, self.reverse = config
+        self.all_same = self.kind in ('solid', 'breathe')
+        self.animated = self.kind in ('breathe', 'chase')
+        self._order = None
+        self._render = None
+        self._rgb = None  # Render function and scratch frame for at()
+        self._rgb_buf = None
+        self._rgb_key = None
+
+    def _compile(self, order):
+        """Return render(buf, num_leds) for strip byte `order`, with its tables built."""
+        bpp = len(order)
+        color = self.color
+        background = self.background
+        kind = self.kind
+
+        if kind == 'solid':
+            px = pack(color, order)
+
+            def render(buf, num_leds):
+                fill(buf, 0, num_leds, px)
+            return render
+
+        if kind == 'breathe':
+            # One packed pixel per step of the period, ~100 steps per second.
+            steps = min(512, max(32, int(self.period * 100)))
+            table = bytearray(steps * bpp)
+            for i in range(steps):
+                raw = (math.sin(2.0 * math.pi * i / steps) + 1.0) / 2.0
+                table[i * bpp:(i + 1) * bpp] = pack(_mix(background, color, _shape(raw, self.gamma)), order)
+            lut = memoryview(table)
+            scale = steps / self.period
+
+            def render(buf, num_leds):
+                i = int(self.last_frame * scale) % steps * bpp
+                fill(buf, 0, num_leds, lut[i:i + bpp])
+            return render
+
+        if kind == 'bar':
+            reached = pack(color, order)
+            unreached = pack(background, order)
+            edges = [pack(_mix(background, color, k / EDGE_LEVELS), order) for k in range(EDGE_LEVELS)]
+            reverse = self.reverse
+
+            def render(buf, num_leds):
+                pos = self.progress * num_leds
+                index = int(pos)
+                if index >= num_leds:
+                    fill(buf, 0, num_leds, reached)
+                    return
+                edge = edges[int((pos - index) * EDGE_LEVELS)]
+                if reverse:
+                    split = num_leds - index
+                    fill(buf, 0, split - 1, unreached)
+                    fill(buf, split - 1, split, edge)
+                    fill(buf, split, num_leds, reached)
+                else:
+                    fill(buf, 0, index, reached)
+                    fill(buf, index, index + 1, edge)
+                    fill(buf, index + 1, num_leds, unreached)
+            return render
+
+        # chase: head pixel first, then the tail fading into the background.
+        length = self.length
+        tail = [pack(_mix(background, color, _shape((length - k) / length, self.gamma)), order)
+                for k in range(length)]
+        back = pack(background, order)
+        period = self.period
+        reverse = self.reverse
+
+        def render(buf, num_leds):
+            head = int(self.last_frame / period * num_leds) % num_leds
+            fill(buf, 0, num_leds, back)
+            for k in range(min(length, num_leds)):
+                i = head - k
+                if i < 0:
+                    i += num_leds
+                if reverse:
+                    i = num_leds - 1 - i
+                buf[i * bpp:(i + 1) * bpp] = tail[k]
+        return render
+
+    def render_into(self, buf, num_leds, order=GRB):
+        if order != self._order:
+            self._render = self._compile(order)
+            self._order = order
+        self._render(buf, num_leds)
+
+    def at(self, pos):
+        # Slow path for callers that still draw pixel by pixel (sim.py).
+        num_leds = self.num_leds or pos + 1
+        key = (self.last_frame, self.progress, num_leds)
+        if key != self._rgb_key:
+            if self._rgb is None:
+                self._rgb = self._compile(RGB)
+            if self._rgb_buf is None or len(self._rgb_buf) != num_leds * 3:
+                self._rgb_buf = bytearray(num_leds * 3)
+            self._rgb(self._rgb_buf, num_leds)
+            self._rgb_key = key
+        return tuple(self._rgb_buf[pos * 3:pos * 3 + 3])
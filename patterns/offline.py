@@ -0,0 +1,30 @@
+from patterns.pattern import Pattern, GRB, pack, fill
+
+
+class Offline(Pattern):
+    def __init__(self, period=2.0, color=(255, 0, 0)):
+        # Slow hard red blink while this printer's broker connection is being
+        # re-established: red as in the original firmware, blinking so it is
+        # not read as Error's breathe or Prepare's orange.
+        super().__init__()
+        self.period = float(period) if period > 0 else 2.0
+        self.color = tuple(int(c) for c in color)
+        self._order = None
+        self._on = None
+        self._off = None
+
+    def bake_key(self):
+        return ('offline', self.period, self.color)
+
+    def lit(self):
+        return (self.last_frame % self.period) < self.period / 2
+
+    def at(self, pos):
+        return self.color if self.lit() else (0, 0, 0)
+
+    def render_into(self, buf, num_leds, order=GRB):
+        if order != self._order:
+            self._on = pack(self.color, order)
+            self._off = bytearray(len(order))
+            self._order = order
+        fill(buf, 0, num_leds, self._on if self.lit() else self._off)
@@ -1,3 +1,49 @@
+# Byte order of a pixel inside a strip buffer: buf[i * bpp + order[c]] = color[c].
+# GRB matches the default NeoPixel ORDER for WS2812 strips.
+GRB = (1, 0, 2)
+RGB = (0, 1, 2)
+GRBW = (1, 0, 2, 3)
+
+
+def pack(color, order=GRB):
+    """Return a bytearray holding `color` laid out in strip byte order.
+
+    Channels missing from `color` (e.g. W on an RGBW strip) are left at 0.
+    """
+    px = bytearray(len(order))
+    for c in range(min(len(color), len(order))):
+        px[order[c]] = color[c]
+    return px
+
+
+def fill(buf, start, end, px):
+    """Fill pixels [start, end) of `buf` with the packed pixel `px`.
+
+    The first pixel is written once and then copied forward in doubling
+    slices, so a run costs O(log n) slice copies instead of n assignments.
+    """
+    bpp = len(px)
+    lo = start * bpp
+    hi = end * bpp
+    if hi <= lo:
+        return
+    mv = memoryview(buf)
+    mv[lo:lo + bpp] = px
+    n = bpp
+    span = hi - lo
+    while n * 2 <= span:
+        mv[lo + n:lo + 2 * n] = mv[lo:lo + n]
+        n *= 2
+    if n < span:
+        mv[lo + n:hi] = mv[lo:hi - n]
+
+
+def fill_segments(buf, segments):
+    """Expand packed (start, end, px) runs into `buf` with bulk fills."""
+    for start, end, px in segments:
+        fill(buf, start, end, px)
+
+
 class Pattern:
     def __init__(self):
         self.last_frame = 0.0
@@ -6,10 +52,44 @@ class Pattern:
         # rendering progress-based effects. Set by caller (e.g. main.py).
         self.num_leds = None
         self.all_same = True
+        # False if the output depends only on progress, not on time, so the
+        # render loop can sleep until the printer state changes.
+        self.animated = True
+        # Packed copy of the last list returned by segments(), see render_into().
+        self._segments_src = None
+        self._segments_order = None
+        self._segments_packed = None
+
+    def reset(self):
+        """Return to the state of a fresh instance before the pattern is shown again.
+
+        Called by PatternRegistry when it reuses an instance. Caches that are
+        keyed on their inputs can stay.
+        """
+        self.last_frame = 0.0
+        self.progress = 0.0
 
     def at(self, pos):
         pass
 
+    def segments(self, num_leds):
+        """Return the frame as a list of (start, end, color) runs, or None.
+
+        Bar-style patterns describe the whole strip with a few runs. They
+        should return the same list object for as long as the frame is
+        unchanged, so render_into() can reuse its packed copy.
+        """
+        return None
+
+    def bake_key(self):
+        """Return a hashable key if the pattern is strictly periodic in time.
+
+        Periodic patterns also expose `period` (seconds) and must render a
+        frame from last_frame alone, so a BakeCache can pre-render one
+        period of them. None means the pattern is always rendered live.
+        """
+        return None
+
     def update(self, current_frame, progress=0.0):
         """Store the provided time/frame value for use by at().
 
@@ -20,6 +100,33 @@ class Pattern:
             self.last_frame = float(current_frame)
             self.progress = float(max(0.0, min(1.0, progress)))
         except Exception:
-            # If conversion fails, just keep the previous value
-            print("Conversion on update failed")
+            # If conversion fails, just keep the previous value. Not logged:
+            # this runs every frame and patterns stay importable on desktop Python.
             pass
+
+    def render_into(self, buf, num_leds, order=GRB):
+        """Write a whole frame of `num_leds` pixels into `buf`.
+
+        `buf` is a bytearray in strip byte order (e.g. NeoPixel.buf) and
+        `order` gives the byte offset of each color channel within a pixel.
+        This generic version expands segments() when the pattern provides
+        them and otherwise falls back to at(); patterns override it with
+        fill()-based paths that avoid per-LED calls.
+        """
+        segments = self.segments(num_leds)
+        if segments is not None:
+            if segments is not self._segments_src or order != self._segments_order:
+                self._segments_packed = [(start, end, pack(color, order)) for start, end, color in segments]
+                self._segments_src = segments
+                self._segments_order = order
+            fill_segments(buf, self._segments_packed)
+            return
+        if self.all_same:
+            fill(buf, 0, num_leds, pack(self.at(0), order))
+            return
+        bpp = len(order)
+        for i in range(num_leds):
+            color = self.at(i)
+            offset = i * bpp
+            for c in range(3):
+                buf[offset + order[c]] = color[c]
@@ -8,9 +8,31 @@ class Paused(Pattern):
         self.unreached_color = unreached_color
         self.reached_color = reached_color
         self.all_same = False
+        self.animated = False
+        self._segments = None
+        self._seg_progress = None  # progress and num_leds _segments was built for
+        self._seg_num_leds = 0
 
     def at(self, pos):
         if pos < (self.progress * self.num_leds):
             return self.reached_color
         else:
             return self.unreached_color
+
+    def segments(self, num_leds):
+        if self.progress != self._seg_progress or num_leds != self._seg_num_leds:
+            # at() lights every pos < progress * num_leds, i.e. up to the ceiling.
+            split = self.progress * num_leds
+            index = int(split)
+            if index < split:
+                index += 1
+            index = min(index, num_leds)
+            segments = []
+            if index > 0:
+                segments.append((0, index, self.reached_color))
+            if index < num_leds:
+                segments.append((index, num_leds, self.unreached_color))
+            self._segments = segments
+            self._seg_progress = self.progress
+            self._seg_num_leds = num_leds
+        return self._segments
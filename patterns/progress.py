@@ -9,8 +9,18 @@ class Progress(Pattern):
         self.progress = 0.0  # From 0.0 to 1.0
         self.progress_pos = 0.0
         self.all_same = False
+        self.animated = False
         self.index = 0
         self.frac = 0
+        self.edge_color = unreached_color
+        self._segments = None
+        self._seg_index = -1  # index, edge_color and num_leds _segments was built for
+        self._seg_edge = None
+        self._seg_num_leds = 0
+
+    def reset(self):
+        super().reset()
+        self.progress_pos = -1.0  # Recompute index and edge on the next update()
 
     def update(self, current_frame, progress=0.0):
         """Store the provided time/frame value for use by at().
@@ -20,10 +30,18 @@ class Progress(Pattern):
         """
         try:
             self.last_frame = float(current_frame)
-            self.progress = float(max(0.0, min(1.0, progress)))
+            progress = float(max(0.0, min(1.0, progress)))
+            if progress == self.progress and self.num_leds * progress == self.progress_pos:
+                return
+            self.progress = progress
             self.progress_pos = self.progress * self.num_leds
             self.index = int(self.progress_pos)
             self.frac = self.progress_pos - self.index
+            # Partially faded-in pixel at the boundary, computed once per change.
+            self.edge_color = tuple(
+                int(self.unreached_color[i] + (self.reached_color[i] - self.unreached_color[i]) * self.frac)
+                for i in range(3)
+            )
         except Exception:
             # If conversion fails, just keep the previous value
             pass
@@ -34,11 +52,25 @@ class Progress(Pattern):
             return self.reached_color
         elif pos == self.index:
             # Partially faded in
-            return tuple(
-                int(self.unreached_color[i] + (self.reached_color[i] - self.unreached_color[i]) * self.frac)
-                for i in range(3)
-            )
+            return self.edge_color
         else:
             # Not reached yet
             return self.unreached_color
 
+    def segments(self, num_leds):
+        # edge_color is a new tuple whenever update() recomputes it.
+        if (self.index != self._seg_index or self.edge_color is not self._seg_edge
+                or num_leds != self._seg_num_leds):
+            index = min(self.index, num_leds)
+            segments = []
+            if index > 0:
+                segments.append((0, index, self.reached_color))
+            if index < num_leds:
+                segments.append((index, index + 1, self.edge_color))
+            if index + 1 < num_leds:
+                segments.append((index + 1, num_leds, self.unreached_color))
+            self._segments = segments
+            self._seg_index = self.index
+            self._seg_edge = self.edge_color
+            self._seg_num_leds = num_leds
+        return self._segments
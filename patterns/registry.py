@@ -0,0 +1,108 @@
+"""Look up patterns by name, importing their modules on first use.
+
+main.py asks for patterns by state name ('progress', 'error', ...) rather
+than importing every pattern class at boot. The registry imports a
+pattern's module the first time it is needed, and keeps one instance per
+(name, slot), so a state transition reuses an object that only needs a
+reset() instead of constructing a new one. Slots keep instances apart
+where they carry per-strip state, e.g. one per layout segment.
+
+drop_unused() forgets every class and instance not in a given set of
+names and removes their modules from sys.modules, so they can be
+collected when memory runs low; they are imported again on next use.
+"""
+
+import sys
+from time import ticks_us, ticks_diff
+
+# Pattern name: (module, class)
+PATTERNS = {
+    'idle': ('patterns.idle', 'Idle'),
+    'error': ('patterns.error', 'Error'),
+    'prepare': ('patterns.prepare', 'Prepare'),
+    'finish': ('patterns.finish', 'Finish'),
+    'paused': ('patterns.paused', 'Paused'),
+    'progress': ('patterns.progress', 'Progress'),
+    'connecting': ('patterns.connecting', 'Connecting'),
+    'offline': ('patterns.offline', 'Offline'),
+}
+
+
+class PatternRegistry:
+    def __init__(self, table=PATTERNS):
+        self.table = dict(table)
+        self._factories = {}  # name: callable returning a new instance
+        self._instances = {}  # (name, slot): instance
+        self.import_us = {}  # name: us spent importing its module (last time)
+        self.imports = 0
+        self.drops = 0
+
+    def register(self, name, factory):
+        """Add or replace a pattern with a ready factory (no import needed)."""
+        self._factories[name] = factory
+        self.table[name] = None
+        self._forget(name)
+
+    def __contains__(self, name):
+        return name in self.table
+
+    def factory(self, name):
+        f = self._factories.get(name)
+        if f is None:
+            module, cls = self.table[name]  # KeyError for unknown names
+            t0 = ticks_us()
+            __import__(module)
+            f = getattr(sys.modules[module], cls)
+            self.import_us[name] = ticks_diff(ticks_us(), t0)
+            self.imports += 1
+            self._factories[name] = f
+        return f
+
+    def get(self, name, slot=None):
+        """Return the instance of `name` for `slot`, reset and ready to show."""
+        key = (name, slot)
+        p = self._instances.get(key)
+        if p is None:
+            p = self.factory(name)()
+            self._instances[key] = p
+        else:
+            p.reset()
+        return p
+
+    def _forget(self, name):
+        """Drop the cached instances of `name`. Returns how many there were."""
+        keys = [k for k in self._instances if k[0] == name]
+        for key in keys:
+            del self._instances[key]
+        return len(keys)
+
+    def drop_unused(self, keep):
+        """Forget patterns whose names are not in `keep` and unload their modules.
+
+        Returns how many patterns actually released something (instances or
+        a module), so a caller can tell whether a collection is worth it.
+        Registered factories stay, and count only while they had instances.
+        """
+        released = 0
+        for name in list(self._factories):
+            if name in keep:
+                continue
+            freed = self._forget(name) > 0
+            spec = self.table.get(name)
+            if spec is None:
+                released += freed
+                continue  # Registered factory: nothing to re-import
+            del self._factories[name]
+            module = spec[0]
+            if module in sys.modules:
+                del sys.modules[module]
+                # The package keeps a reference to its submodule as well.
+                parent, _, child = module.rpartition('.')
+                try:
+                    delattr(sys.modules[parent], child)
+                except (KeyError, AttributeError):
+                    pass
+                freed = True
+            released += freed
+            self.drops += 1
+        return released
@@ -0,0 +1,241 @@
+"""Pull a few fields out of a Bambu report without building the full dict.
+
+A `pushall` report is many kilobytes of AMS, temperature and fan data, but
+the firmware only needs a handful of values from it. ReportExtractor scans
+the raw payload once, descends only into the objects and arrays that lead
+to a declared key path, skips everything else (jumping to each string's
+closing quote with a native search rather than byte by byte) and decodes
+just the matched values. Scanning stops as soon as every path was found.
+
+Paths are tuples of object keys (str) and array indices (int), e.g.
+('print', 'lights_report', 0, 'mode').
+"""
+
+import json
+import sys
+
+# The viper emitter is a compiler feature, not an attribute of the micropython module.
+_VIPER = sys.implementation.name == 'micropython'
+if _VIPER:
+    import micropython
+
+_WS = 0x20  # Anything <= space is treated as whitespace
+_QUOTE = 0x22
+_BSLASH = 0x5C
+_COMMA = 0x2C
+_COLON = 0x3A
+_LBRACE = 0x7B
+_RBRACE = 0x7D
+_LBRACK = 0x5B
+_RBRACK = 0x5D
+
+# Fields tracked by main.py, keyed by the name they are returned under.
+REPORT_FIELDS = {
+    'light': ('print', 'lights_report', 0, 'mode'),
+    'hms': ('print', 'hms'),
+    'gcode_state': ('print', 'gcode_state'),
+    'mc_percent': ('print', 'mc_percent'),
+    'stg_cur': ('print', 'stg_cur'),
+}
+
+
+# bytes.find() is the fast way to the next quote, but memoryview (what
+# mqtt_as hands over in msg_view mode) has no find(), nor does bytearray on
+# MicroPython. Those go through _find_quote(): a viper loop over the raw
+# buffer on the board, a compiled regex (which accepts any buffer) on a
+# desktop Python.
+if _VIPER:
+    @micropython.viper
+    def _find_quote(buf, i: int) -> int:
+        n = int(len(buf))
+        p = ptr8(buf)  # noqa: F821 (viper builtin)
+        while i < n:
+            if p[i] == 0x22:
+                return i
+            i += 1
+        return -1
+else:
+    import re
+
+    _QUOTE_RE = re.compile(b'"')
+
+    def _find_quote(buf, i):
+        m = _QUOTE_RE.search(buf, i)
+        return m.start() if m else -1
+
+
+class ReportExtractor:
+    def __init__(self, fields=REPORT_FIELDS):
+        # Build a trie: each node is a list of (key, child) pairs where key
+        # is bytes (object key) or int (array index) and child is either
+        # another node or the field name (str) for a leaf.
+        self._root = []
+        self._count = len(fields)
+        for name, path in fields.items():
+            node = self._root
+            for depth, part in enumerate(path):
+                if isinstance(part, str):
+                    part = part.encode()
+                leaf = depth == len(path) - 1
+                for key, child in node:
+                    if key == part:
+                        node = child
+                        break
+                else:
+                    child = name if leaf else []
+                    node.append((part, child))
+                    node = child
+
+    def extract(self, buf):
+        """Return a dict of field name -> decoded value for the paths present in `buf`.
+
+        `buf` may be bytes, bytearray or a memoryview holding exactly one
+        JSON document. Raises ValueError on malformed input.
+        """
+        out = {}
+        # Both are called as find(arg, start): buf.find(b'"', i) or _find_quote(buf, i).
+        find = getattr(buf, 'find', None)
+        if find is not None:
+            self._find, self._arg = find, b'"'
+        else:
+            self._find, self._arg = _find_quote, buf
+        try:
+            i = self._ws(buf, 0)
+            self._walk(buf, i, self._root, out)
+        except IndexError:
+            raise ValueError("Truncated JSON")
+        finally:
+            self._find = self._arg = None
+        return out
+
+    def _ws(self, buf, i):
+        while buf[i] <= _WS:
+            i += 1
+        return i
+
+    def _string_end(self, buf, i):
+        # i is at the opening quote; return the index after the closing one.
+        find = self._find
+        arg = self._arg
+        i += 1
+        while True:
+            j = find(arg, i)
+            if j < 0:
+                raise ValueError("Unterminated string")
+            k = j - 1
+            while buf[k] == _BSLASH:
+                k -= 1
+            if (j - k) & 1:  # Even number of backslashes: real quote
+                return j + 1
+            i = j + 1
+
+    def _skip(self, buf, i):
+        # i is at the start of a value; return the index just after it.
+        c = buf[i]
+        if c == _QUOTE:
+            return self._string_end(buf, i)
+        if c == _LBRACE or c == _LBRACK:
+            find = self._find
+            arg = self._arg
+            depth = 0
+            while True:
+                c = buf[i]
+                if c == _QUOTE:
+                    # Inline the common unescaped case; it dominates skipping.
+                    j = find(arg, i + 1)
+                    if j > 0 and buf[j - 1] != _BSLASH:
+                        i = j + 1
+                        continue
+                    i = self._string_end(buf, i)
+                    continue
+                if c == _LBRACE or c == _LBRACK:
+                    depth += 1
+                elif c == _RBRACE or c == _RBRACK:
+                    depth -= 1
+                    if depth == 0:
+                        return i + 1
+                i += 1
+        while True:
+            c = buf[i]
+            if c == _COMMA or c == _RBRACE or c == _RBRACK or c <= _WS:
+                return i
+            i += 1
+
+    def _key_is(self, buf, start, end, key):
+        if end - start != len(key):
+            return False
+        for k in range(len(key)):
+            if buf[start + k] != key[k]:
+                return False
+        return True
+
+    def _child(self, buf, start, end, node):
+        for key, child in node:
+            if isinstance(key, bytes) and self._key_is(buf, start, end, key):
+                return child
+        return None
+
+    def _leaf(self, buf, i, name, out):
+        end = self._skip(buf, i)
+        out[name] = json.loads(bytes(buf[i:end]).decode())
+        return -1 if len(out) == self._count else end
+
+    def _walk(self, buf, i, node, out):
+        # Returns the index after the value at i, or -1 once every field is found.
+        c = buf[i]
+        if c == _LBRACE:
+            i = self._ws(buf, i + 1)
+            if buf[i] == _RBRACE:
+                return i + 1
+            while True:
+                if buf[i] != _QUOTE:
+                    raise ValueError("Expected object key")
+                end = self._string_end(buf, i)
+                child = self._child(buf, i + 1, end - 1, node)
+                i = self._ws(buf, end)
+                if buf[i] != _COLON:
+                    raise ValueError("Expected ':'")
+                i = self._ws(buf, i + 1)
+                if child is None:
+                    i = self._skip(buf, i)
+                elif isinstance(child, str):
+                    i = self._leaf(buf, i, child, out)
+                else:
+                    i = self._walk(buf, i, child, out)
+                if i < 0:
+                    return i
+                i = self._ws(buf, i)
+                c = buf[i]
+                if c == _RBRACE:
+                    return i + 1
+                if c != _COMMA:
+                    raise ValueError("Expected ',' or '}'")
+                i = self._ws(buf, i + 1)
+        if c == _LBRACK:
+            i = self._ws(buf, i + 1)
+            if buf[i] == _RBRACK:
+                return i + 1
+            index = 0
+            while True:
+                child = None
+                for key, sub in node:
+                    if key == index:
+                        child = sub
+                        break
+                if child is None:
+                    i = self._skip(buf, i)
+                elif isinstance(child, str):
+                    i = self._leaf(buf, i, child, out)
+                else:
+                    i = self._walk(buf, i, child, out)
+                if i < 0:
+                    return i
+                i = self._ws(buf, i)
+                c = buf[i]
+                if c == _RBRACK:
+                    return i + 1
+                if c != _COMMA:
+                    raise ValueError("Expected ',' or ']'")
+                i = self._ws(buf, i + 1)
+                index += 1
+        return self._skip(buf, i)
@@ -0,0 +1,102 @@
+"""Keep the last known printer state in a small flash file.
+
+After a boot the strip can show what the printers were doing before the
+network is even up, instead of Connecting until the first report. The
+file holds, per serial, the fields PrinterState tracks, plus the wall
+time it was written:
+
+    {"t": 815000000, "printers": {"01S00A000000000": [true, [], "RUNNING", 42, 0]}}
+
+Writes are rate-limited (at most one per `interval_ms`, however often
+reports change the state) to spare the flash, and go to a temporary file
+that is then renamed over the old one, so a reset mid-write leaves the
+previous snapshot intact.
+
+A snapshot's age is only known once the RTC is set: after a power cycle
+the clock restarts behind the saved time, and the snapshot counts as
+stale. Within one boot, age is the time since the printer last reported.
+"""
+
+import asyncio
+import json
+import os
+import time
+from time import ticks_ms, ticks_diff
+
+from runtime import log
+
+
+class StateStore:
+    def __init__(self, path='state.json', interval_ms=30000):
+        self.path = path
+        self.interval_ms = interval_ms
+        self.writes = 0
+        self._printers = ()
+        self._dirty = asyncio.Event()
+        self._last_write = None
+
+    def load(self, printers):
+        """Restore each printer's state from the file. Returns how many were restored."""
+        self._printers = printers
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            saved_at = data["t"]
+            saved = data["printers"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0  # No snapshot yet, or a damaged one
+        if not isinstance(saved, dict):
+            return 0
+        n = 0
+        for printer in printers:
+            values = saved.get(printer.serial)
+            if values is None:
+                continue
+            try:
+                printer.state.restore(values)
+            except Exception as e:  # Whatever is wrong with it, the printer starts fresh
+                log.warn("Discarding saved state of %s: %s", printer.serial, e)
+                continue
+            printer.restored = True
+            printer.saved_at = saved_at
+            n += 1
+        return n
+
+    def changed(self):
+        """Note that a printer's state changed; it is written within interval_ms."""
+        self._dirty.set()
+
+    def save(self):
+        data = {"t": time.time(), "printers": {p.serial: p.state.snapshot() for p in self._printers}}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.rename(tmp, self.path)
+        self.writes += 1
+        self._last_write = ticks_ms()
+
+    async def run(self):
+        """Write the snapshot whenever the state changed, at most once per interval."""
+        while True:
+            await self._dirty.wait()
+            if self._last_write is not None:
+                wait = self.interval_ms - ticks_diff(ticks_ms(), self._last_write)
+                if wait > 0:
+                    await asyncio.sleep_ms(wait)
+            self._dirty.clear()
+            try:
+                self.save()
+            except OSError as e:
+                log.error("Saving state failed: %s", e)
+                self._last_write = ticks_ms()
+
+
+def age_s(printer):
+    """Seconds since `printer`'s state was last current, or None if unknown."""
+    if printer.report_ms is not None:
+        return ticks_diff(ticks_ms(), printer.report_ms) // 1000
+    if printer.saved_at is not None:
+        age = int(time.time() - printer.saved_at)
+        if age >= 0:
+            return age
+    return None
@@ -0,0 +1,165 @@
+"""Per-printer state for a controller that may watch several printers.
+
+Bambu printers send one full `pushall` report and then partial deltas.
+PrinterState keeps the fields main.py tracks in a few slots, merges each
+report into them in place and ORs a bit per field that actually changed
+into `changed`, so pattern selection (and anything else downstream) can
+skip reports that only repeat known values. gcode_state is interned to a
+small int.
+
+Each Printer pairs a PrinterState with how to reach the printer (broker,
+port, TLS, access code), its report topic, the status segments it drives
+and the supervised connection it is reached over. Connection settings fall back to the top-level keys of
+settings.json, so a print farm behind one local broker only needs to list
+serials.
+"""
+
+GCODE_STATES = ('UNKNOWN', 'IDLE', 'PREPARE', 'RUNNING', 'PAUSE', 'FINISH', 'FAILED', 'SLICING', 'INIT', 'OFFLINE')
+GCODE_UNKNOWN = 0
+GCODE_IDLE = 1
+GCODE_PREPARE = 2
+GCODE_RUNNING = 3
+GCODE_PAUSE = 4
+GCODE_FINISH = 5
+GCODE_FAILED = 6
+
+# Bits of PrinterState.changed
+F_LIGHT = 1
+F_HMS = 2
+F_GCODE = 4
+F_PROGRESS = 8
+F_STAGE = 16
+F_ONLINE = 32
+F_ALL = 63
+
+
+def intern_gcode(name):
+    """Map a gcode_state string to its index in GCODE_STATES, or GCODE_UNKNOWN."""
+    for i in range(len(GCODE_STATES)):
+        if GCODE_STATES[i] == name:
+            return i
+    return GCODE_UNKNOWN
+
+
+def _int(v):
+    """int(v), or None if the report sent something that is not a number."""
+    try:
+        return int(v)
+    except (ValueError, TypeError):
+        return None
+
+
+class PrinterState:
+    __slots__ = ('light', 'hms', 'gcode', 'progress', 'stage', 'online', 'changed')
+
+    def __init__(self):
+        self.light = False
+        self.hms = []
+        self.gcode = GCODE_IDLE
+        self.progress = 0
+        self.stage = 0
+        self.online = False
+        self.changed = F_ALL  # Everything is news until the render task has seen it
+
+    def merge(self, fields):
+        """Apply the fields extracted from a report. Returns the bits that changed."""
+        mask = 0
+        v = fields.get("light")
+        if v is not None and (v == "on") != self.light:
+            self.light = v == "on"
+            mask |= F_LIGHT
+        v = fields.get("hms")
+        if v is not None and v != self.hms:
+            self.hms = v
+            mask |= F_HMS
+        v = fields.get("gcode_state")
+        if v is not None:
+            v = intern_gcode(v)
+            if v != self.gcode:
+                self.gcode = v
+                mask |= F_GCODE
+        # A malformed number is skipped, keeping the last good value.
+        v = _int(fields.get("mc_percent"))
+        if v is not None and v != self.progress:
+            self.progress = v
+            mask |= F_PROGRESS
+        v = _int(fields.get("stg_cur"))
+        if v is not None and v != self.stage:
+            self.stage = v
+            mask |= F_STAGE
+        self.changed |= mask
+        return mask
+
+    def set_online(self, online):
+        if online == self.online:
+            return 0
+        self.online = online
+        self.changed |= F_ONLINE
+        return F_ONLINE
+
+    def take(self):
+        """Return and clear the bits changed since the last call."""
+        mask = self.changed
+        self.changed = 0
+        return mask
+
+    def gcode_name(self):
+        return GCODE_STATES[self.gcode]
+
+    def snapshot(self):
+        """The tracked fields as a JSON-friendly list, for printer/snapshot.py."""
+        return [self.light, self.hms, self.gcode_name(), self.progress, self.stage]
+
+    def restore(self, values):
+        """Load a snapshot() list. Raises, changing nothing, if it is malformed."""
+        light = bool(values[0])
+        hms = values[1]
+        if not isinstance(hms, list):
+            raise TypeError("hms must be a list")
+        gcode = intern_gcode(values[2])
+        progress = int(values[3])
+        stage = int(values[4])
+        self.light = light
+        self.hms = hms
+        self.gcode = gcode
+        self.progress = progress
+        self.stage = stage
+        self.changed = F_ALL
+
+
+class Printer:
+    def __init__(self, serial, server, port=8883, tls=True, password=''):
+        self.serial = serial
+        self.server = server
+        self.port = port
+        self.tls = tls
+        self.password = password
+        self.topic = f'device/{serial}/report'
+        self.request_topic = f'device/{serial}/request'
+        self.state = PrinterState()
+        self.reported = False  # True once a report has arrived
+        self.report_ms = None  # ticks_ms() of the last report
+        self.restored = False  # True if the state came from the snapshot file
+        self.saved_at = None  # Wall time the restored snapshot was written
+        self.displays = []  # Status segments this printer drives
+        self.link = None  # Supervised broker connection, set by main.py
+        self.pattern = None  # Pattern classes currently shown
+        self.overlay = None
+
+    def broker(self):
+        """Key shared by printers that can use the same MQTT connection."""
+        return (self.server, self.port, self.tls, self.password)
+
+
+def parse_printers(settings):
+    """Return the printers listed in settings.json, or the single top-level one."""
+    specs = settings.get("printers") or [{}]
+    printers = []
+    for spec in specs:
+        printers.append(Printer(
+            spec.get("serial", settings.get("serial", "none")),
+            spec.get("mqtt_ip", settings.get("mqtt_ip", "192.168.1.117")),
+            spec.get("mqtt_port", settings.get("mqtt_port", 8883)),
+            spec.get("mqtt_tls", settings.get("mqtt_tls", True)),
+            spec.get("lan_access_code", settings.get("lan_access_code", ""))))
+    return printers
@@ -0,0 +1,88 @@
+"""Run garbage collections where they cost the least.
+
+A gc.collect() is a full-heap pause of a few milliseconds on the Pico,
+and calling it unconditionally (after every message, every second) puts
+that pause wherever the call happens to be, often in the middle of a
+frame. GCPacer collects only when it is worth it: when the heap has grown
+by `alloc_threshold` bytes since the last collection, or free memory is
+below `low_water`, or a caller released memory and asked for one with
+request(). The render loop asks it right after a frame was
+written, so the pause lands in the sleep before the next deadline, and
+it waits for a frame with enough slack for the last pause, unless memory
+is short or twice the threshold has been allocated. Pause durations go
+into a Histogram.
+
+Checking costs one gc.mem_alloc() (a scan of the allocation table), so
+it is only done every `every` frames.
+"""
+
+import gc
+from time import ticks_us, ticks_diff
+
+from runtime.metrics import Histogram
+
+
+class GCPacer:
+    def __init__(self, alloc_threshold=16384, low_water=24576, every=8):
+        self.alloc_threshold = alloc_threshold
+        self.low_water = low_water
+        self.every = every
+        self.pauses = Histogram()
+        self.collections = 0
+        self.deferred = 0  # Due collections put off for lack of slack
+        self.last_us = 0
+        self._heap = gc.mem_free() + gc.mem_alloc()
+        self._after = gc.mem_alloc()  # Allocated right after the last collection
+        self._frames = 0
+        self._requested = False
+
+    def collect(self):
+        t0 = ticks_us()
+        gc.collect()
+        self.last_us = ticks_diff(ticks_us(), t0)
+        self.pauses.record(self.last_us)
+        self._after = gc.mem_alloc()
+        self.collections += 1
+        self._requested = False
+
+    def request(self):
+        """Ask for a collection at the next good moment, e.g. after dropping references."""
+        self._requested = True
+
+    def due(self):
+        """Return 2 if a collection cannot wait, 1 if one is due, else 0."""
+        alloc = gc.mem_alloc()
+        grown = alloc - self._after
+        # Short on memory, but only if something was allocated since the
+        # last collection: collecting a heap of live objects frees nothing.
+        if self._heap - alloc < self.low_water and grown >= self.alloc_threshold // 8:
+            return 2
+        if grown >= 2 * self.alloc_threshold:
+            return 2  # Put off too long already
+        return 1 if self._requested or grown >= self.alloc_threshold else 0
+
+    def after_frame(self, slack_us=None):
+        """Collect if due; call right after a frame was written.
+
+        slack_us is the time left until the next frame deadline, or None
+        if the render loop is about to idle.
+        """
+        self._frames += 1
+        if self._frames < self.every:
+            return False
+        self._frames = 0
+        due = self.due()
+        if not due:
+            return False
+        if due == 1 and slack_us is not None and slack_us < self.last_us:
+            self.deferred += 1
+            return False
+        self.collect()
+        return True
+
+    def idle(self):
+        """Collect if due; for callers outside the render loop while it is idle."""
+        if self.due():
+            self.collect()
+            return True
+        return False
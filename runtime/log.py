@@ -0,0 +1,233 @@
+"""Leveled logging into a preallocated ring buffer.
+
+print() over USB-CDC costs real time per line, and building the string
+costs an allocation even when nobody is watching. Records are instead
+packed into a fixed bytearray: level, ticks_ms, the format string (stored
+once, by index) and the raw arguments. Ints and floats are packed as is,
+strings as bytes, anything else as its str(). The text is only built
+when the ring is read, by dump() from the REPL or text() for an MQTT
+request. When the ring is full the oldest records are overwritten.
+
+    from runtime import log
+    log.info("Pattern %s for %s", name, serial)
+
+The level functions of disabled levels are bound to a no-op, so a
+disabled call costs the call itself and its argument expressions, no
+packing. Records at or above the echo level are also printed as they
+are logged (warnings and errors by default), so a board on the bench
+still shows them.
+"""
+
+import struct
+from time import ticks_ms
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+_NAMES = {DEBUG: 'D', INFO: 'I', WARN: 'W', ERROR: 'E'}
+
+_HEADER = 10  # length u16, level u8, nargs u8, ticks u32, format u16
+_MAX_RECORD = 256
+_MAX_STR = 120  # Longer string arguments are cut
+_MAX_FORMATS = 255  # Format strings beyond this many are stored inline
+_INLINE = 0xFFFF
+
+
+def _format(fmt, args):
+    if not args:
+        return fmt
+    try:
+        return fmt % args
+    except (TypeError, ValueError):  # Arguments cut or not matching the format
+        return fmt + ' ' + ' '.join(str(a) for a in args)
+
+
+class Ring:
+    def __init__(self, size=4096):
+        self.buf = bytearray(size)
+        self._rec = bytearray(_MAX_RECORD)
+        self._out = bytearray(_MAX_RECORD)
+        self._formats = []
+        self._format_ids = {}
+        self._head = 0  # Start of the oldest record
+        self._tail = 0  # Where the next record goes
+        self._used = 0
+        self.records = 0  # Records logged since boot
+        self.overwritten = 0  # Records lost to wrap-around
+
+    def _format_id(self, fmt):
+        i = self._format_ids.get(fmt)
+        if i is None:
+            if len(self._formats) >= _MAX_FORMATS:
+                return _INLINE
+            i = len(self._formats)
+            self._formats.append(fmt)
+            self._format_ids[fmt] = i
+        return i
+
+    def _pack_str(self, rec, p, s):
+        b = s if isinstance(s, (bytes, bytearray)) else s.encode()
+        n = min(len(b), _MAX_STR, _MAX_RECORD - p - 2)
+        rec[p] = ord('s')
+        rec[p + 1] = n
+        rec[p + 2:p + 2 + n] = b[:n]
+        return p + 2 + n
+
+    def write(self, level, fmt, args):
+        rec = self._rec
+        fid = self._format_id(fmt)
+        p = _HEADER
+        if fid == _INLINE:
+            p = self._pack_str(rec, p, fmt)
+        nargs = 0
+        for a in args:
+            if p > _MAX_RECORD - 8:
+                break  # No room: drop the remaining arguments
+            if isinstance(a, bool) or a is None:
+                a = str(a)
+            if isinstance(a, int) and -0x80000000 <= a <= 0x7FFFFFFF:
+                rec[p] = ord('i')
+                struct.pack_into('<i', rec, p + 1, a)
+                p += 5
+            elif isinstance(a, float):
+                rec[p] = ord('f')
+                struct.pack_into('<f', rec, p + 1, a)
+                p += 5
+            else:
+                p = self._pack_str(rec, p, a if isinstance(a, (str, bytes, bytearray)) else str(a))
+            nargs += 1
+        struct.pack_into('<HBBIH', rec, 0, p, level, nargs, ticks_ms(), fid)
+        self._put(p)
+        self.records += 1
+
+    def _put(self, n):
+        size = len(self.buf)
+        if n > size:
+            self.overwritten += 1  # Can never fit: lost like an overwritten record
+            return
+        while self._used + n > size:
+            self._drop()
+        first = min(n, size - self._tail)
+        self.buf[self._tail:self._tail + first] = self._rec[:first]
+        if first < n:
+            self.buf[:n - first] = self._rec[first:n]
+        self._tail = (self._tail + n) % size
+        self._used += n
+
+    def _copy_out(self, start, n):
+        size = len(self.buf)
+        first = min(n, size - start)
+        out = self._out
+        out[:first] = self.buf[start:start + first]
+        if first < n:
+            out[first:n] = self.buf[:n - first]
+        return out
+
+    def _drop(self):
+        n = struct.unpack_from('<H', self._copy_out(self._head, 2))[0]
+        self._head = (self._head + n) % len(self.buf)
+        self._used -= n
+        self.overwritten += 1
+
+    def _decode(self, rec):
+        n, level, nargs, ticks, fid = struct.unpack_from('<HBBIH', rec)
+        p = _HEADER
+        args = []
+        if fid == _INLINE:
+            k = rec[p + 1]
+            fmt = str(bytes(rec[p + 2:p + 2 + k]), 'utf-8')
+            p += 2 + k
+        else:
+            fmt = self._formats[fid]
+        for _ in range(nargs):
+            tag = rec[p]
+            if tag == ord('i'):
+                args.append(struct.unpack_from('<i', rec, p + 1)[0])
+                p += 5
+            elif tag == ord('f'):
+                args.append(struct.unpack_from('<f', rec, p + 1)[0])
+                p += 5
+            else:
+                k = rec[p + 1]
+                try:
+                    args.append(str(bytes(rec[p + 2:p + 2 + k]), 'utf-8'))
+                except UnicodeError:  # A multi-byte character was cut
+                    args.append(repr(bytes(rec[p + 2:p + 2 + k])))
+                p += 2 + k
+        msg = _format(fmt, tuple(args))
+        return '%10.3f %s %s' % (ticks / 1000, _NAMES.get(level, '?'), msg)
+
+    def lines(self):
+        """Yield the records, oldest first, as text."""
+        p = self._head
+        left = self._used
+        while left > 0:
+            n = struct.unpack_from('<H', self._copy_out(p, 2))[0]
+            yield self._decode(self._copy_out(p, n))
+            p = (p + n) % len(self.buf)
+            left -= n
+
+    def clear(self):
+        self._head = self._tail = self._used = 0
+
+
+_ring = Ring()
+_echo = WARN
+
+
+def _noop(fmt, *args):
+    pass
+
+
+def _logger(level):
+    def log(fmt, *args):
+        _ring.write(level, fmt, args)
+        if level >= _echo:
+            print(_format(fmt, args))
+    return log
+
+
+debug = _noop
+info = _noop
+warn = _noop
+error = _noop
+
+
+def configure(level=INFO, echo=WARN, size=None):
+    """Set the lowest level recorded, the lowest level also printed, and the ring size.
+
+    The ring holds at least one record of the largest size.
+    """
+    global debug, info, warn, error, _ring, _echo
+    if size is not None:
+        size = max(size, _MAX_RECORD)
+    if size is not None and size != len(_ring.buf):
+        _ring = Ring(size)
+    _echo = echo
+    debug = _logger(DEBUG) if level <= DEBUG else _noop
+    info = _logger(INFO) if level <= INFO else _noop
+    warn = _logger(WARN) if level <= WARN else _noop
+    error = _logger(ERROR) if level <= ERROR else _noop
+
+
+def level_from_name(name, default=INFO):
+    return {'debug': DEBUG, 'info': INFO, 'warn': WARN, 'error': ERROR}.get(name, default)
+
+
+def ring():
+    return _ring
+
+
+def dump(out=print):
+    """Print every record in the ring, oldest first (e.g. from the REPL after Ctrl-C)."""
+    for line in _ring.lines():
+        out(line)
+
+
+def text():
+    """The whole ring as one string, e.g. to publish over MQTT."""
+    return '\n'.join(_ring.lines())
+
+
+configure()
@@ -0,0 +1,129 @@
+"""Cheap counters, gauges and fixed-bucket statistics for the firmware.
+
+Metrics is a registry of named Counters, Gauges and Histograms. Recording
+into any of them is an attribute update or a short loop, never an
+allocation, so the render loop and the MQTT callback can record freely.
+Gauges can also be backed by a function that is only called when a
+snapshot is taken, for values that already live elsewhere (free memory,
+reconnect counts).
+
+snapshot() returns a compact dict for publishing:
+
+    {"up": 3605, "c": {"frames": 360211}, "g": {"mem_free": 81234},
+     "h": {"render_us": [1000, 412, 1890, [900, 80, 20, 0, 0, 0, 0, 0, 0]]}}
+
+Counters are totals since boot. Histograms are [count, mean, max, bucket
+counts] for the window since the previous snapshot, which resets them;
+histograms with no samples in the window are left out.
+"""
+
+from time import ticks_ms, ticks_diff
+
+# Bucket upper bounds in microseconds, roughly doubling from 250 us to 32 ms.
+US_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+# Bucket upper bounds in bytes, for message sizes.
+BYTE_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Gauge:
+    __slots__ = ('value', 'fn')
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self.fn = fn  # If set, called for the value at snapshot time
+
+    def set(self, value):
+        self.value = value
+
+    def read(self):
+        return self.fn() if self.fn is not None else self.value
+
+
+class Histogram:
+    """Counts samples into fixed buckets; the last bucket catches overflow.
+
+    Recording never allocates, so it is safe to call from the render loop.
+    """
+    def __init__(self, bounds=US_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        i = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total // self.count if self.count else 0
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._boot = ticks_ms()
+
+    def counter(self, name):
+        c = self.counters.get(name)
+        if c is None:
+            c = self.counters[name] = Counter()
+        return c
+
+    def gauge(self, name, fn=None):
+        g = self.gauges.get(name)
+        if g is None:
+            g = self.gauges[name] = Gauge(fn)
+        return g
+
+    def histogram(self, name, bounds=US_BUCKETS):
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = Histogram(bounds)
+        return h
+
+    def add(self, name, histogram):
+        """Register a Histogram that is owned elsewhere (e.g. by the FrameScheduler)."""
+        self.histograms[name] = histogram
+        return histogram
+
+    def snapshot(self):
+        """Return the compact snapshot and start a new histogram window."""
+        hist = {}
+        for name, h in self.histograms.items():
+            if h.count:  # Empty windows are left out
+                hist[name] = [h.count, h.mean(), h.max, list(h.counts)]
+                h.reset()
+        return {
+            "up": ticks_diff(ticks_ms(), self._boot) // 1000,
+            "c": {name: c.value for name, c in self.counters.items()},
+            "g": {name: g.read() for name, g in self.gauges.items()},
+            "h": hist,
+        }
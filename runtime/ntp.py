@@ -0,0 +1,58 @@
+"""Set the RTC over NTP without stalling the event loop.
+
+ntptime.settime() waits for the reply in a blocking recv(), so the render
+loop and every broker connection freeze for up to its timeout on each
+sync. settime() here sends the same SNTP request from a non-blocking UDP
+socket and polls for the reply between asyncio sleeps. The one remaining
+stall is the DNS lookup of the server, which blocks like every
+getaddrinfo() on the board; it is done once and the address reused.
+"""
+
+import asyncio
+import socket
+import struct
+import time
+from errno import EAGAIN, ETIMEDOUT
+from time import ticks_ms, ticks_diff
+
+from machine import RTC
+
+# Seconds from the NTP epoch (1900) to the port's epoch (2000, or 1970 on Unix).
+NTP_DELTA = 3155673600 if time.gmtime(0)[0] == 2000 else 2208988800
+
+_addrs = {}  # (host, port): resolved address
+
+
+async def query(host='pool.ntp.org', port=123, timeout_ms=2000):
+    """Return the server's time in seconds since the epoch. Raises OSError on failure."""
+    addr = _addrs.get((host, port))
+    if addr is None:
+        addr = socket.getaddrinfo(host, port)[0][-1]  # Blocks, once per server
+        _addrs[(host, port)] = addr
+    request = bytearray(48)
+    request[0] = 0x1B  # LI 0, version 3, client mode
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.setblocking(False)
+        s.sendto(request, addr)
+        t0 = ticks_ms()
+        while True:
+            try:
+                msg = s.recv(48)
+                break
+            except OSError as e:
+                if e.args[0] != EAGAIN:
+                    raise
+            if ticks_diff(ticks_ms(), t0) >= timeout_ms:
+                raise OSError(ETIMEDOUT)
+            await asyncio.sleep_ms(20)
+    finally:
+        s.close()
+    if len(msg) < 48:
+        raise OSError(ETIMEDOUT)
+    return struct.unpack('!I', msg[40:44])[0] - NTP_DELTA
+
+
+async def settime(host='pool.ntp.org', port=123, timeout_ms=2000):
+    tm = time.gmtime(await query(host, port, timeout_ms))
+    RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
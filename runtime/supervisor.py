@@ -0,0 +1,191 @@
+"""Bring up and watch Wi-Fi and the broker connections without blocking.
+
+The render loop keeps running through every outage; status segments show
+the `offline` pattern for the printers whose connection is down and pick
+up again when it returns. Nothing here resets the board: failures are
+retried after an exponentially growing delay with jitter, so a board
+that lost its access point does not hammer it (or the broker) when it
+comes back, and a farm of boards does not retry in lockstep.
+
+The Supervisor owns the Wi-Fi interface, which every broker connection
+shares. Clients wait on Supervisor.wifi() (mqtt_as's wifi_up hook) and
+only ever retry their broker, so a powered-off printer cannot take the
+link down under the healthy ones. Wi-Fi is only reset when it looks up
+but no broker at all has been reachable for RESET_AFTER attempts each
+(edge of range, or an access point that stopped routing).
+
+Each broker connection is a Link. mqtt_as reports state changes through
+the Link's wifi_coro and paces its own reconnects with the Link's
+Backoff. A Link records how many outages it had, how long each lasted
+(connection lost to reconnected) and the time to recover (connection
+lost to the first report after it, i.e. when the LEDs are current again).
+"""
+
+import asyncio
+from random import randint
+from time import ticks_ms, ticks_diff
+
+from runtime import log
+from runtime.metrics import Histogram
+
+# Outage bucket upper bounds in ms, from a broker blip to a router reboot.
+MS_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+# Failed reconnects in a row, on every link, before Wi-Fi itself is reset.
+RESET_AFTER = 8
+
+
+class Backoff:
+    """Exponential delays with "equal jitter": half fixed, half random."""
+    def __init__(self, first_ms=500, max_ms=60000, factor=2):
+        self.first_ms = first_ms
+        self.max_ms = max_ms
+        self.factor = factor
+        self.attempts = 0
+        self._delay = first_ms
+
+    def next(self):
+        """Return the ms to wait before the next attempt."""
+        delay = self._delay
+        self._delay = min(self.max_ms, delay * self.factor)
+        self.attempts += 1
+        half = delay // 2
+        return half + randint(0, half)
+
+    def reset(self):
+        self._delay = self.first_ms
+        self.attempts = 0
+
+
+class Link:
+    """One broker connection and the printers behind it."""
+    def __init__(self, printers, backoff, on_change):
+        self.printers = printers
+        self.client = None  # Set once the MQTTClient is built with this Link's hooks
+        self.backoff = backoff
+        self._on_change = on_change
+        self.up = False
+        self.outages = 0
+        self.outage_ms = Histogram(MS_BUCKETS)  # Lost to reconnected
+        self.recover_ms = Histogram(MS_BUCKETS)  # Lost to first report after
+        self._down_at = None  # Start of the current outage, until recovered
+
+    async def on_wifi(self, up):
+        """mqtt_as wifi_coro: called with False when the connection drops, True when it is back."""
+        if up == self.up:
+            return
+        self.up = up
+        now = ticks_ms()
+        if not up:
+            self.outages += 1
+            self._down_at = now
+        elif self._down_at is not None:
+            self.outage_ms.record(ticks_diff(now, self._down_at))
+        changed = False
+        for printer in self.printers:
+            if printer.state.set_online(up):
+                changed = True
+        if changed:
+            self._on_change()
+
+    def reported(self):
+        """Note a report from one of this link's printers (cheap unless recovering)."""
+        if self._down_at is not None and self.up:
+            self.recover_ms.record(ticks_diff(ticks_ms(), self._down_at))
+            self._down_at = None
+
+
+class Supervisor:
+    def __init__(self, wlan, ssid, password, on_change, first_ms=500, max_ms=60000):
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        self.on_change = on_change  # Called when a printer goes on- or offline
+        self.first_ms = first_ms
+        self.max_ms = max_ms
+        self.links = []
+        self.wifi_attempts = 0
+        self.wifi_resets = 0
+        self._wifi_lock = asyncio.Lock()  # One bring-up at a time, however many links wait
+        self._reset_base = 0  # Failures every link had at the last reset
+
+    def backoff(self):
+        return Backoff(self.first_ms, self.max_ms)
+
+    def link(self, printers):
+        link = Link(printers, self.backoff(), self.on_change)
+        self.links.append(link)
+        return link
+
+    def _unreachable(self):
+        """True if every link failed RESET_AFTER more reconnects since the last reset."""
+        least = None
+        for link in self.links:
+            if link.client is None:
+                return False
+            failures = link.client.failures
+            if least is None or failures < least:
+                least = failures
+        if least is None:
+            return False
+        if least < self._reset_base:  # A link got through since
+            self._reset_base = 0
+        return least >= self._reset_base + RESET_AFTER
+
+    async def wifi(self, timeout_ms=10000):
+        """Return once Wi-Fi is up, bringing it up with backoff if it is not.
+
+        Also mqtt_as's wifi_up hook, awaited by every client before it
+        retries its broker.
+        """
+        async with self._wifi_lock:
+            if self.wlan.isconnected():
+                if not self._unreachable():
+                    return
+                log.warn("No broker reachable over Wi-Fi, resetting it")
+                self._reset_base += RESET_AFTER
+                self.wifi_resets += 1
+                self.wlan.disconnect()
+            await self._bring_up(timeout_ms)
+
+    async def _bring_up(self, timeout_ms):
+        backoff = self.backoff()
+        while not self.wlan.isconnected():
+            self.wifi_attempts += 1
+            log.info("Connecting to network %s", self.ssid)
+            self.wlan.connect(self.ssid, self.password)
+            t0 = ticks_ms()
+            while not self.wlan.isconnected() and ticks_diff(ticks_ms(), t0) < timeout_ms:
+                await asyncio.sleep_ms(100)
+            if not self.wlan.isconnected():
+                self.wlan.disconnect()
+                delay = backoff.next()
+                log.warn("Wi-Fi not up, status %d, retrying in %d ms", self.wlan.status(), delay)
+                await asyncio.sleep_ms(delay)
+        log.info("Network config: %s", self.wlan.ifconfig())
+
+    async def connect(self, link):
+        """First connection of a link's client; retries with backoff until it succeeds.
+
+        Later reconnects are mqtt_as's job, paced by the same Backoff.
+        """
+        while True:
+            try:
+                # The link is already up: quick skips mqtt_as's own Wi-Fi bring-up.
+                await link.client.connect(quick=True)
+                link.backoff.reset()
+                return
+            except OSError as e:
+                delay = link.backoff.next()
+                log.warn("MQTT connect failed for %s: %s, retrying in %d ms", link.client.server, e, delay)
+                await asyncio.sleep_ms(delay)
+
+    async def connect_all(self):
+        await asyncio.gather(*[self.connect(link) for link in self.links])
+
+    def down(self):
+        """Number of links currently down."""
+        n = 0
+        for link in self.links:
+            if not link.up:
+                n += 1
+        return n